@@ -0,0 +1,387 @@
+"""
+Archive activity_logs to partitioned Parquet and query the archive locally.
+
+export streams activity_logs documents out of MongoDB in large batches and
+writes them as a Hive-partitioned Parquet dataset:
+
+    <archive>/date=YYYY-MM-DD/hostname=<host>/part-<run>-<n>.parquet
+
+The layout is compact compared with the raw BSON documents:
+
+- hostname and date are partition directories, not stored per row
+- username and status are dictionary-encoded (status as int8 codes)
+- timestamp is a millisecond timestamp column, the counters are float32
+- files are zstd-compressed
+
+Documents are read in _id order and each batch is appended to one open file
+per (date, hostname) partition, so memory is bounded by --batch-size. Existing
+files are never rewritten: the archive stores the _id of the last exported
+document (_export_state.json) and the next export resumes after it, which also
+picks up documents inserted late for days already archived. A document
+exported twice is stored twice; the query helpers de-duplicate on object_id.
+
+Exported documents can optionally be deleted from MongoDB, but only when the number
+of archived documents matches the number still in the exported range. The query helpers
+scan the Parquet set with pyarrow.dataset (partition pruning on date and
+hostname), or with DuckDB SQL when duckdb is installed, so historical reports
+never touch the production database.
+
+Usage:
+python activity_archive.py export --out archive --delete
+python activity_archive.py export --out archive --since 2024-01-01 --until 2024-04-01
+python activity_archive.py report --archive archive --since 2024-01-01 --by hostname
+python activity_archive.py sql --archive archive "SELECT username, count(*) FROM activity_logs GROUP BY 1"
+"""
+import os
+import json
+import time
+import logging
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from bson import ObjectId
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+SCHEMA = pa.schema([
+    ("object_id"        , pa.binary(12)),
+    ("username"         , pa.dictionary(pa.int32(), pa.string())),
+    ("timestamp"        , pa.timestamp("ms")),
+    ("status"           , pa.dictionary(pa.int8(), pa.string())),
+    ("active_time"      , pa.float32()),
+    ("inactive_time"    , pa.float32()),
+    ("date"             , pa.string()),
+    ("hostname"         , pa.string()),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string()), ("hostname", pa.string())]), flavor="hive")
+
+# Columns stored in the files; date and hostname live in the partition directories
+FILE_SCHEMA = pa.schema([field for field in SCHEMA if field.name not in ("date", "hostname")])
+
+# Not picked up as data: pyarrow.dataset skips names starting with "_" or "."
+STATE_FILE = "_export_state.json"
+
+PROJECTION = {"username": 1, "hostname": 1, "timestamp": 1, "status": 1, "active_time": 1, "inactive_time": 1}
+
+
+def parse_day(value):
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def documents_to_table(documents):
+    """
+    Convert a batch of activity_logs documents to an Arrow table with SCHEMA.
+
+    Documents without a username, hostname or datetime timestamp are skipped.
+    """
+    columns = {name: [] for name in SCHEMA.names}
+    for document in documents:
+        timestamp = document.get("timestamp")
+        if not document.get("username") or not document.get("hostname") or not isinstance(timestamp, datetime):
+            continue
+        columns["object_id"].append(document["_id"].binary)
+        columns["username"].append(document["username"])
+        columns["timestamp"].append(timestamp)
+        columns["status"].append(document.get("status"))
+        columns["active_time"].append(document.get("active_time"))
+        columns["inactive_time"].append(document.get("inactive_time"))
+        columns["date"].append(timestamp.strftime("%Y-%m-%d"))
+        columns["hostname"].append(document["hostname"])
+
+    arrays = []
+    for field in SCHEMA:
+        if pa.types.is_dictionary(field.type):
+            array = pa.array(columns[field.name], pa.string()).dictionary_encode().cast(field.type)
+        else:
+            array = pa.array(columns[field.name], field.type)
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+
+def drop_duplicates(table):
+    """Keep the first row of every object_id, for documents that were exported more than once."""
+    object_ids = pc.cast(table["object_id"], pa.binary())
+    if pc.count_distinct(object_ids).as_py() == table.num_rows:
+        return table
+    rows = pa.table({"object_id": object_ids, "row": np.arange(table.num_rows)})
+    first = rows.group_by("object_id").aggregate([("row", "min")])["row_min"]
+    return table.take(np.sort(first.to_numpy()))
+
+
+class ActivityArchive:
+    def __init__(self, archive_dir, batch_size=100000, compression="zstd"):
+        """
+        Initializes the ActivityArchive object.
+
+        Parameters:
+        - archive_dir (str): Root directory of the Parquet dataset.
+        - batch_size (int): Documents fetched from MongoDB and written per batch; bounds the export's memory. Default is 100000.
+        - compression (str): Parquet compression codec. Default is "zstd".
+        """
+        self.archive_dir    = archive_dir
+        self.batch_size     = batch_size
+        self.compression    = compression
+
+    def load_watermark(self):
+        """Return the _id of the last document exported by a resumed run, or None."""
+        try:
+            with open(os.path.join(self.archive_dir, STATE_FILE), "r") as file:
+                return ObjectId(json.load(file)["last_id"])
+        except FileNotFoundError:
+            return None
+
+    def save_watermark(self, last_id):
+        """Write the watermark to STATE_FILE through a temporary file and a rename."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, STATE_FILE)
+        with open(path + ".tmp", "w") as file:
+            json.dump({"last_id": str(last_id), "updated_at": datetime.now().isoformat()}, file)
+        os.replace(path + ".tmp", path)
+
+    def write_batch(self, table, run_tag, writers, sequence):
+        """
+        Append a batch to the open file of each (date, hostname) partition it touches.
+
+        Files of partitions the batch does not touch are closed, so only the partitions of the
+        current batch are open; a partition that reappears later gets its next sequence number.
+        """
+        partitions = table.select(["date", "hostname"]).group_by(["date", "hostname"]).aggregate([]).to_pylist()
+        touched = set()
+        for partition in partitions:
+            key = (partition["date"], partition["hostname"])
+            touched.add(key)
+            if key not in writers:
+                directory = os.path.join(self.archive_dir, f"date={key[0]}", f"hostname={key[1]}")
+                os.makedirs(directory, exist_ok=True)
+                number = sequence.get(key, 0)
+                sequence[key] = number + 1
+                path = os.path.join(directory, f"part-{run_tag}-{number}.parquet")
+                # Written under a hidden name and renamed on close, so readers never see a partial file
+                temp_path = os.path.join(directory, f".part-{run_tag}-{number}.parquet.tmp")
+                writers[key] = (pq.ParquetWriter(temp_path, FILE_SCHEMA, compression=self.compression), temp_path, path)
+            mask = pc.and_(pc.equal(table["date"], key[0]), pc.equal(table["hostname"], key[1]))
+            writers[key][0].write_table(table.filter(mask).select(FILE_SCHEMA.names))
+        for key in [key for key in writers if key not in touched]:
+            self.close_writer(writers.pop(key))
+
+    @staticmethod
+    def close_writer(writer):
+        writer, temp_path, path = writer
+        writer.close()
+        os.replace(temp_path, path)
+
+    def export(self, collection, since=None, until=None, delete=False):
+        """
+        Stream activity_logs documents inserted before `until` into the archive, in _id order.
+
+        Without `since`, the export resumes after the last document of the previous resumed
+        run (the watermark stored in the archive), so documents inserted late for days that
+        are already archived are picked up by the next routine run. Every run writes new files
+        and never touches existing ones; a document exported twice (a re-export with `since`,
+        or a run interrupted before saving the watermark) is stored twice and dropped by the
+        query helpers, which de-duplicate on object_id.
+
+        Parameters:
+        collection: The activity_logs collection.
+        since (datetime, optional): Re-export documents inserted from this time on, ignoring the watermark.
+        until (datetime, optional): Export documents inserted before this time. Defaults to the start
+            of today, so the day still being written is never archived.
+        delete (bool): Delete the exported documents from MongoDB once they are archived. Default is False.
+
+        Returns:
+        dict: Documents read, rows written, documents deleted and elapsed seconds.
+        """
+        until = until or datetime.combine(datetime.now().date(), datetime.min.time())
+        watermark = self.load_watermark()
+        bounds = {"$lt": ObjectId.from_datetime(until.astimezone(timezone.utc))}
+        if since is not None:
+            bounds["$gte"] = start = ObjectId.from_datetime(since.astimezone(timezone.utc))
+            # Only move the watermark if this run covers everything after it
+            resumes = watermark is None or start <= watermark
+        elif watermark is not None:
+            bounds["$gt"] = watermark
+            resumes = True
+        else:
+            resumes = True
+
+        started = time.perf_counter()
+        read = written = 0
+        last_id = None
+        run_tag = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        writers, sequence = {}, {}
+        batch = []
+
+        cursor = collection.find({"_id": bounds}, PROJECTION).sort("_id", 1).batch_size(self.batch_size)
+        try:
+            for document in cursor:
+                batch.append(document)
+                if len(batch) >= self.batch_size:
+                    table = documents_to_table(batch)
+                    self.write_batch(table, run_tag, writers, sequence)
+                    written += table.num_rows
+                    read += len(batch)
+                    last_id = batch[-1]["_id"]
+                    batch = []
+                    logging.info(f"Archived {read} documents...")
+            if batch:
+                table = documents_to_table(batch)
+                self.write_batch(table, run_tag, writers, sequence)
+                written += table.num_rows
+                read += len(batch)
+                last_id = batch[-1]["_id"]
+        finally:
+            for writer in writers.values():
+                self.close_writer(writer)
+
+        if last_id is not None and resumes and (watermark is None or last_id > watermark):
+            self.save_watermark(last_id)
+
+        deleted = 0
+        if delete and written != read:
+            logging.warning(f"{read - written} documents lacked a username, hostname or timestamp and were not "
+                            f"archived; nothing deleted.")
+        elif delete and last_id is not None:
+            query = {"_id": {key: value for key, value in bounds.items() if key != "$lt"}}
+            query["_id"]["$lte"] = last_id
+            remaining = collection.count_documents(query)
+            if remaining == read:
+                deleted = collection.delete_many(query).deleted_count
+                logging.info(f"Deleted {deleted} archived documents from MongoDB.")
+            else:
+                logging.warning(f"Range changed during export ({read} archived, {remaining} now present); "
+                                f"nothing deleted. Re-run the export with --delete.")
+
+        return {"read": read, "written": written, "deleted": deleted, "seconds": time.perf_counter() - started}
+
+    def dataset(self):
+        return ds.dataset(self.archive_dir, format="parquet", partitioning=PARTITIONING)
+
+    def scan(self, since=None, until=None, hostnames=None, usernames=None, columns=None):
+        """
+        Read archived rows, pruning partitions by date and hostname before any file is opened.
+
+        Parameters:
+        since, until (str, optional): Inclusive "YYYY-MM-DD" bounds.
+        hostnames, usernames (list, optional): Keep only these hosts / users.
+        columns (list, optional): Columns to read. Default is all.
+
+        Returns:
+        pyarrow.Table: One row per archived document, duplicates from re-exports removed.
+        """
+        condition = None
+        filters = []
+        if since:
+            filters.append(ds.field("date") >= since)
+        if until:
+            filters.append(ds.field("date") <= until)
+        if hostnames:
+            filters.append(ds.field("hostname").isin(hostnames))
+        if usernames:
+            filters.append(ds.field("username").cast(pa.string()).isin(usernames))
+        for expression in filters:
+            condition = expression if condition is None else condition & expression
+        read_columns = columns if columns is None or "object_id" in columns else columns + ["object_id"]
+        table = drop_duplicates(self.dataset().to_table(columns=read_columns, filter=condition))
+        return table if columns is None else table.select(columns)
+
+    def daily_report(self, since=None, until=None, by="username"):
+        """
+        Sample counts and active ratio per group, computed from the archive only.
+
+        Parameters:
+        by (str): "username", "hostname" or "date". Default is "username".
+
+        Returns:
+        list: One dict per group, sorted by group.
+        """
+        table = self.scan(since, until, columns=[by, "status", "timestamp"])
+        active = pc.fill_null(pc.equal(pc.cast(table["status"], pa.string()), "Active"), False)
+        table = table.append_column("active", pc.cast(active, pa.int64()))
+        if pa.types.is_dictionary(table.schema.field(by).type):
+            table = table.set_column(table.schema.get_field_index(by), by, pc.cast(table[by], pa.string()))
+
+        grouped = table.group_by(by).aggregate([("active", "count"), ("active", "sum"),
+                                                ("timestamp", "min"), ("timestamp", "max")])
+        rows = []
+        for row in sorted(grouped.to_pylist(), key=lambda row: row[by]):
+            rows.append({
+                by                  : row[by],
+                "samples"           : row["active_count"],
+                "active_samples"    : row["active_sum"],
+                "active_ratio"      : row["active_sum"] / row["active_count"] if row["active_count"] else 0.0,
+                "first_seen"        : row["timestamp_min"],
+                "last_seen"         : row["timestamp_max"],
+            })
+        return rows
+
+    def sql(self, statement):
+        """
+        Run SQL over the archive with DuckDB, exposed as the view activity_logs (one row per object_id).
+
+        Returns:
+        pyarrow.Table
+        """
+        if duckdb is None:
+            raise RuntimeError("duckdb is not installed; use scan() or daily_report() instead.")
+        connection = duckdb.connect()
+        pattern = os.path.join(self.archive_dir, "**", "*.parquet").replace("\\", "/")
+        connection.execute(f"CREATE VIEW activity_logs AS SELECT DISTINCT ON (object_id) * "
+                           f"FROM read_parquet('{pattern}', hive_partitioning = true)")
+        return connection.execute(statement).arrow()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive activity_logs to Parquet and query the archive.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Stream activity_logs into the Parquet archive")
+    export_parser.add_argument("--out", default="archive", help="Archive directory")
+    export_parser.add_argument("--since", help="Re-export documents inserted from this day on (YYYY-MM-DD). "
+                                               "Default resumes after the last exported document")
+    export_parser.add_argument("--until", help="Export documents inserted before this day. Default is today")
+    export_parser.add_argument("--batch-size", type=int, default=100000)
+    export_parser.add_argument("--delete", action="store_true", help="Delete the exported documents from MongoDB")
+
+    report_parser = subparsers.add_parser("report", help="Per-group report from the archive")
+    report_parser.add_argument("--archive", default="archive")
+    report_parser.add_argument("--since", help="First day (YYYY-MM-DD)")
+    report_parser.add_argument("--until", help="Last day (YYYY-MM-DD)")
+    report_parser.add_argument("--by", choices=["username", "hostname", "date"], default="username")
+
+    sql_parser = subparsers.add_parser("sql", help="Run DuckDB SQL against the activity_logs view of the archive")
+    sql_parser.add_argument("--archive", default="archive")
+    sql_parser.add_argument("statement")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "export":
+        import connect_to_db
+
+        archive = ActivityArchive(args.out, batch_size=args.batch_size)
+        with connect_to_db.MongoDatabase() as db:
+            result = archive.export(db.activity_collection,
+                                    parse_day(args.since) if args.since else None,
+                                    parse_day(args.until) if args.until else None,
+                                    delete=args.delete)
+        print(f"Archived {result['written']}/{result['read']} documents to {args.out} in {result['seconds']:.2f}s")
+        if args.delete:
+            print(f"Deleted {result['deleted']} documents from MongoDB")
+    elif args.command == "report":
+        rows = ActivityArchive(args.archive).daily_report(args.since, args.until, args.by)
+        for row in rows:
+            print(f"{row[args.by]}: {row['samples']} samples, {row['active_ratio']:.1%} active, "
+                  f"{row['first_seen']} - {row['last_seen']}")
+        print(f"Report over {len(rows)} groups in {(time.perf_counter() - started) * 1000:.1f} ms")
+    else:
+        print(ActivityArchive(args.archive).sql(args.statement).to_pandas().to_string(index=False))
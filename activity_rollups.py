@@ -0,0 +1,327 @@
+"""
+Incremental per-user / per-host / per-day rollups of activity_logs.
+
+InactivityDetector writes one activity_logs document per check, carrying the
+session's cumulative active_time / inactive_time counters. Reports used to
+rescan those raw documents; this module folds them into one small document
+per (username, hostname, day) in the activity_rollups collection instead:
+
+    {username, hostname, day: "YYYY-MM-DD",
+     samples, active_samples, inactive_samples,
+     active_seconds, inactive_seconds, first_seen, last_seen}
+
+Only documents newer than the stored watermark (the last processed _id) are
+read. They are streamed in _id order, the per-user/host counter deltas are
+computed against the last counters seen, and each batch is applied with
+$inc / $min / $max upserts. Reports read only the rollups, so their cost
+depends on the number of users, hosts and days asked for, not on how much
+raw history exists.
+
+Applying a batch is idempotent: the batch's last _id is recorded as pending
+before the write and stored on every rollup it touches, and upserts skip
+rollups that already carry it. A run interrupted mid-batch replays exactly
+that batch on the next update without counting anything twice.
+
+Documents are only picked up once they are `settle_seconds` old, so inserts
+from clients with slightly skewed clocks (ObjectIds are generated client-side)
+are not skipped by the watermark.
+
+Usage:
+python activity_rollups.py update
+python activity_rollups.py backfill
+python activity_rollups.py report --since 2024-05-01 --until 2024-05-31 --by hostname
+"""
+import time
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+import connect_to_db
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+STATE_ID = "activity_rollups"
+
+PROJECTION = {"username": 1, "hostname": 1, "timestamp": 1, "status": 1, "active_time": 1, "inactive_time": 1}
+
+DUPLICATE_KEY = 11000
+
+
+def rollup_key(username, hostname, day):
+    return f"{username}|{hostname}|{day}"
+
+
+class ActivityRollups:
+    def __init__(self, db, batch_size=5000, settle_seconds=60):
+        """
+        Initializes the ActivityRollups object.
+
+        Parameters:
+        - db (MongoDatabase): Connected database from connect_to_db.
+        - batch_size (int): Raw documents read and applied per bulk write. Default is 5000.
+        - settle_seconds (int): Age a raw document must reach before it is rolled up. Default is 60 seconds.
+        """
+        self.activity_collection    = db.activity_collection
+        self.rollup_collection      = db.rollup_collection
+        self.state_collection       = db.rollup_state_collection
+        self.batch_size             = batch_size
+        self.settle_seconds         = settle_seconds
+
+        self.ensure_indexes()
+
+    def ensure_indexes(self):
+        """Create the indexes the report queries rely on (no-op when they already exist)."""
+        self.rollup_collection.create_index([("day", ASCENDING), ("username", ASCENDING)])
+        self.rollup_collection.create_index([("day", ASCENDING), ("hostname", ASCENDING)])
+
+    def load_state(self):
+        """Return the watermark _id (or None), the last cumulative counters per user|host and the pending batch _id."""
+        state = self.state_collection.find_one({"_id": STATE_ID}) or {}
+        last_counters = {key: [active, inactive] for key, active, inactive in state.get("last_counters", [])}
+        return state.get("last_id"), last_counters, state.get("pending_id")
+
+    def save_pending(self, pending_id):
+        """Record the batch about to be written; the watermark and counters stay at their pre-batch values."""
+        self.state_collection.update_one({"_id": STATE_ID}, {"$set": {"pending_id": pending_id}}, upsert=True)
+
+    def save_state(self, last_id, last_counters):
+        # Stored as a list: hostnames may contain dots, which are not safe in field names
+        counters = [[key, active, inactive] for key, (active, inactive) in last_counters.items()]
+        self.state_collection.update_one(
+            {"_id": STATE_ID},
+            {"$set": {"last_id": last_id, "last_counters": counters, "updated_at": datetime.now()},
+             "$unset": {"pending_id": ""}},
+            upsert=True,
+        )
+
+    @staticmethod
+    def fold(documents, last_counters):
+        """
+        Fold raw activity documents (in _id order) into per-(username, hostname, day) increments.
+
+        active_time / inactive_time are cumulative per session, so each document contributes
+        its difference from the previous document of the same user and host. If either counter
+        goes down a new session started, and the document's own values are the increments for
+        both counters.
+
+        Parameters:
+        documents (iterable): activity_logs documents.
+        last_counters (dict): "username|hostname" -> [active_time, inactive_time], updated in place.
+
+        Returns:
+        tuple: (increments dict keyed by rollup_key, last _id seen or None)
+        """
+        increments = {}
+        last_id = None
+        for document in documents:
+            last_id = document["_id"]
+            username = document.get("username")
+            hostname = document.get("hostname")
+            timestamp = document.get("timestamp")
+            if not username or not hostname or not isinstance(timestamp, datetime):
+                continue
+
+            active = float(document.get("active_time") or 0.0)
+            inactive = float(document.get("inactive_time") or 0.0)
+            previous_active, previous_inactive = last_counters.get(f"{username}|{hostname}", (0.0, 0.0))
+            if active < previous_active or inactive < previous_inactive:
+                active_delta, inactive_delta = active, inactive
+            else:
+                active_delta, inactive_delta = active - previous_active, inactive - previous_inactive
+            last_counters[f"{username}|{hostname}"] = [active, inactive]
+
+            day = timestamp.strftime("%Y-%m-%d")
+            key = rollup_key(username, hostname, day)
+            entry = increments.get(key)
+            if entry is None:
+                entry = increments[key] = {
+                    "username"          : username,
+                    "hostname"          : hostname,
+                    "day"               : day,
+                    "samples"           : 0,
+                    "active_samples"    : 0,
+                    "inactive_samples"  : 0,
+                    "active_seconds"    : 0.0,
+                    "inactive_seconds"  : 0.0,
+                    "first_seen"        : timestamp,
+                    "last_seen"         : timestamp,
+                }
+            entry["samples"] += 1
+            if document.get("status") == "Active":
+                entry["active_samples"] += 1
+            elif document.get("status") == "Inactive":
+                entry["inactive_samples"] += 1
+            entry["active_seconds"] += active_delta
+            entry["inactive_seconds"] += inactive_delta
+            entry["first_seen"] = min(entry["first_seen"], timestamp)
+            entry["last_seen"] = max(entry["last_seen"], timestamp)
+
+        return increments, last_id
+
+    @staticmethod
+    def to_updates(increments, batch_id):
+        """
+        Turn folded increments into $inc / $min / $max upserts, one per rollup document.
+
+        Each update only matches a rollup that has not seen `batch_id` yet. For a rollup that
+        already has it, the upsert fails with a duplicate key error, which _write ignores.
+        """
+        updates = []
+        for key, entry in increments.items():
+            updates.append(UpdateOne(
+                {"_id": key, "last_batch": {"$ne": batch_id}},
+                {
+                    "$setOnInsert"  : {"username": entry["username"], "hostname": entry["hostname"], "day": entry["day"]},
+                    "$set"          : {"last_batch": batch_id},
+                    "$inc"          : {field: entry[field] for field in ("samples", "active_samples", "inactive_samples",
+                                                                         "active_seconds", "inactive_seconds")},
+                    "$min"          : {"first_seen": entry["first_seen"]},
+                    "$max"          : {"last_seen": entry["last_seen"]},
+                },
+                upsert=True,
+            ))
+        return updates
+
+    def update(self):
+        """
+        Roll up every settled activity_logs document above the watermark.
+
+        The watermark is advanced after each applied batch. If the previous run stopped
+        between writing a batch and advancing the watermark, that exact batch is replayed
+        first; rollups it already reached are skipped, so nothing is counted twice.
+
+        Returns:
+        int: Number of raw documents processed.
+        """
+        last_id, last_counters, pending_id = self.load_state()
+        processed = 0
+
+        if pending_id is not None:
+            logging.info(f"Replaying interrupted batch up to {pending_id}")
+            batch = list(self._find(last_id, {"$lte": pending_id}))
+            if batch:
+                processed += self._apply(batch, last_counters)
+            else:
+                self.save_state(pending_id, last_counters)
+            last_id = pending_id
+
+        cutoff = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(seconds=self.settle_seconds))
+        cursor = self._find(last_id, {"$lt": cutoff})
+
+        batch = []
+        for document in cursor:
+            batch.append(document)
+            if len(batch) >= self.batch_size:
+                processed += self._apply(batch, last_counters)
+                batch = []
+        if batch:
+            processed += self._apply(batch, last_counters)
+
+        logging.info(f"Rolled up {processed} activity documents.")
+        return processed
+
+    def _find(self, after_id, upper_bound):
+        query = {"_id": dict(upper_bound)}
+        if after_id is not None:
+            query["_id"]["$gt"] = after_id
+        return self.activity_collection.find(query, PROJECTION).sort("_id", ASCENDING).batch_size(self.batch_size)
+
+    def _write(self, updates):
+        try:
+            self.rollup_collection.bulk_write(updates, ordered=False)
+        except BulkWriteError as e:
+            # Duplicate keys are rollups that already hold this batch; anything else is a real failure
+            errors = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY]
+            if errors or e.details.get("writeConcernErrors"):
+                raise
+
+    def _apply(self, batch, last_counters):
+        increments, batch_id = self.fold(batch, last_counters)
+        if batch_id is None:
+            return 0
+        updates = self.to_updates(increments, batch_id)
+        if updates:
+            self.save_pending(batch_id)
+            self._write(updates)
+        self.save_state(batch_id, last_counters)
+        return len(batch)
+
+    def backfill(self):
+        """Drop the rollups and the watermark, then rebuild everything from activity_logs."""
+        logging.info("Rebuilding activity rollups from the full activity_logs history...")
+        self.rollup_collection.delete_many({})
+        self.state_collection.delete_one({"_id": STATE_ID})
+        return self.update()
+
+    def report(self, since=None, until=None, by="username", teams=None):
+        """
+        Aggregate rollups over a day range.
+
+        Parameters:
+        since, until (str): Inclusive "YYYY-MM-DD" bounds; open-ended when None.
+        by (str): "username", "hostname", "day" or "team". Default is "username".
+        teams (dict): Team name -> list of usernames, required when by is "team".
+
+        Returns:
+        list: One dict per group with samples, active/inactive seconds and active ratio, sorted by group.
+        """
+        query = {}
+        if since or until:
+            query["day"] = {}
+            if since:
+                query["day"]["$gte"] = since
+            if until:
+                query["day"]["$lte"] = until
+
+        team_of = {}
+        for team, members in (teams or {}).items():
+            for member in members:
+                team_of[member] = team
+
+        fields = ("samples", "active_samples", "inactive_samples", "active_seconds", "inactive_seconds")
+        groups = {}
+        for document in self.rollup_collection.find(query, {"_id": 0}):
+            group = team_of.get(document["username"], "unassigned") if by == "team" else document[by]
+            totals = groups.setdefault(group, dict.fromkeys(fields, 0))
+            for field in fields:
+                totals[field] += document.get(field, 0)
+
+        rows = []
+        for group in sorted(groups):
+            totals = groups[group]
+            tracked = totals["active_seconds"] + totals["inactive_seconds"]
+            rows.append({by: group, **totals, "active_ratio": totals["active_seconds"] / tracked if tracked else 0.0})
+        return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain and query per-user/host/day activity rollups.")
+    parser.add_argument("command", choices=["update", "backfill", "report"])
+    parser.add_argument("--since", help="First day of the report (YYYY-MM-DD)")
+    parser.add_argument("--until", help="Last day of the report (YYYY-MM-DD)")
+    parser.add_argument("--by", choices=["username", "hostname", "day", "team"], default="username")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    with connect_to_db.MongoDatabase() as db:
+        rollups = ActivityRollups(db, batch_size=args.batch_size)
+        started = time.perf_counter()
+
+        if args.command == "update":
+            count = rollups.update()
+            print(f"Rolled up {count} new documents in {time.perf_counter() - started:.2f}s")
+        elif args.command == "backfill":
+            count = rollups.backfill()
+            print(f"Backfilled rollups from {count} documents in {time.perf_counter() - started:.2f}s")
+        else:
+            rows = rollups.report(args.since, args.until, args.by, db.teams)
+            elapsed = time.perf_counter() - started
+            for row in rows:
+                print(f"{row[args.by]}: active {timedelta(seconds=int(row['active_seconds']))}, "
+                      f"inactive {timedelta(seconds=int(row['inactive_seconds']))} "
+                      f"({row['active_ratio']:.1%} active, {row['samples']} samples)")
+            print(f"Report over {len(rows)} groups in {elapsed * 1000:.1f} ms")
@@ -0,0 +1,281 @@
+"""
+Vectorized analytic keyframe interpolation.
+
+Interpolates every joint and every query frame at once with NumPy:
+translations use cubic Hermite splines with Catmull-Rom tangents, rotations
+are converted to quaternions and interpolated with squad (spherical cubic
+slerp). Needs no trained model, so it is the fallback when no cached
+interpolator is available and the reference baseline for the MLP.
+
+Rotations are Euler angles in degrees with Maya's default XYZ rotate order
+(X applied first, i.e. R = Rz * Ry * Rx).
+
+Usage:
+python analytic_interpolation.py Walking_A.csv Walking_C.csv --key-every 4
+"""
+import time
+import argparse
+
+import numpy as np
+
+
+# ===================================================================================================================================
+# Quaternion helpers, all operating on (..., 4) arrays in (w, x, y, z) order
+# ===================================================================================================================================
+def quaternion_multiply(a, b):
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+    return np.stack([aw * bw - ax * bx - ay * by - az * bz,
+                     aw * bx + ax * bw + ay * bz - az * by,
+                     aw * by - ax * bz + ay * bw + az * bx,
+                     aw * bz + ax * by - ay * bx + az * bw], axis=-1)
+
+
+def quaternion_conjugate(q):
+    return q * np.array([1.0, -1.0, -1.0, -1.0])
+
+
+def quaternion_log(q):
+    """Logarithm of unit quaternions, returned as pure quaternions (w = 0)."""
+    v = q[..., 1:]
+    norm = np.linalg.norm(v, axis=-1, keepdims=True)
+    angle = np.arctan2(norm, q[..., :1])
+    scale = np.where(norm > 1e-12, angle / np.maximum(norm, 1e-12), 1.0)
+    return np.concatenate([np.zeros_like(angle), v * scale], axis=-1)
+
+
+def quaternion_exp(q):
+    """Exponential of pure quaternions."""
+    v = q[..., 1:]
+    angle = np.linalg.norm(v, axis=-1, keepdims=True)
+    scale = np.where(angle > 1e-12, np.sin(angle) / np.maximum(angle, 1e-12), 1.0)
+    return np.concatenate([np.cos(angle), v * scale], axis=-1)
+
+
+def euler_to_quaternion(angles):
+    """
+    Convert XYZ-order Euler angles in degrees to unit quaternions.
+
+    Parameters:
+    angles (numpy.ndarray): Array of shape (..., 3).
+
+    Returns:
+    numpy.ndarray: Array of shape (..., 4).
+    """
+    half = np.radians(angles) / 2
+    cx, cy, cz = np.moveaxis(np.cos(half), -1, 0)
+    sx, sy, sz = np.moveaxis(np.sin(half), -1, 0)
+    # q = qz * qy * qx
+    return np.stack([cx * cy * cz + sx * sy * sz,
+                     sx * cy * cz - cx * sy * sz,
+                     cx * sy * cz + sx * cy * sz,
+                     cx * cy * sz - sx * sy * cz], axis=-1)
+
+
+def quaternion_to_euler(q):
+    """
+    Convert unit quaternions to XYZ-order Euler angles in degrees.
+
+    Parameters:
+    q (numpy.ndarray): Array of shape (..., 4).
+
+    Returns:
+    numpy.ndarray: Array of shape (..., 3).
+    """
+    w, x, y, z = np.moveaxis(q, -1, 0)
+    rx = np.arctan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y))
+    ry = np.arcsin(np.clip(2 * (w * y - x * z), -1.0, 1.0))
+    rz = np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
+    return np.degrees(np.stack([rx, ry, rz], axis=-1))
+
+
+def slerp(a, b, t):
+    """
+    Spherical linear interpolation between unit quaternions, along the shortest arc.
+
+    Parameters:
+    a, b (numpy.ndarray): Arrays of shape (..., 4).
+    t (numpy.ndarray): Interpolation weights broadcastable to (..., 1).
+    """
+    dot = np.sum(a * b, axis=-1, keepdims=True)
+    b = np.where(dot < 0, -b, b)
+    dot = np.clip(np.abs(dot), -1.0, 1.0)
+
+    angle = np.arccos(dot)
+    sin_angle = np.sin(angle)
+    close = sin_angle < 1e-6
+    safe_sin = np.where(close, 1.0, sin_angle)
+
+    wa = np.where(close, 1 - t, np.sin((1 - t) * angle) / safe_sin)
+    wb = np.where(close, t, np.sin(t * angle) / safe_sin)
+    result = wa * a + wb * b
+    return result / np.linalg.norm(result, axis=-1, keepdims=True)
+
+
+def squad(q1, q2, s1, s2, t):
+    """Spherical cubic interpolation between q1 and q2 with inner control points s1 and s2."""
+    return slerp(slerp(q1, q2, t), slerp(s1, s2, t), 2 * t * (1 - t))
+
+
+def squad_control_points(keys):
+    """
+    Compute squad inner control points for a key sequence.
+
+    Parameters:
+    keys (numpy.ndarray): Array of shape (keys, ..., 4), already in a consistent hemisphere.
+    """
+    previous = np.concatenate([keys[:1], keys[:-1]])
+    following = np.concatenate([keys[1:], keys[-1:]])
+    inverse = quaternion_conjugate(keys)
+    tangent = (quaternion_log(quaternion_multiply(inverse, following)) +
+               quaternion_log(quaternion_multiply(inverse, previous))) / -4
+    return quaternion_multiply(keys, quaternion_exp(tangent))
+
+
+def align_hemispheres(keys):
+    """Flip quaternion signs along the key axis so consecutive keys are on the same hemisphere."""
+    # Key i must be negated if an odd number of sign changes occur between it and key 0
+    dots = np.sum(keys[1:] * keys[:-1], axis=-1, keepdims=True)
+    flips = np.cumsum(dots < 0, axis=0) % 2
+    signs = np.concatenate([np.ones_like(flips[:1]), 1 - 2 * flips])
+    return keys * signs
+
+
+# ===================================================================================================================================
+# Interpolation
+# ===================================================================================================================================
+def hermite_tangents(key_times, keys):
+    """Catmull-Rom tangents (finite differences) for keys of shape (keys, ...), one-sided at the ends."""
+    return np.gradient(keys, key_times, axis=0)
+
+
+def interpolate_keys(key_times, key_poses, query_times):
+    """
+    Interpolate key poses at arbitrary times.
+
+    Parameters:
+    key_times (numpy.ndarray): Strictly increasing key times of shape (keys,).
+    key_poses (numpy.ndarray): Array of shape (keys, joints, 6) with translate XYZ / rotate XYZ.
+    query_times (numpy.ndarray): Times of shape (queries,). Times outside the key range are clamped.
+
+    Returns:
+    numpy.ndarray: Array of shape (queries, joints, 6).
+    """
+    key_times = np.asarray(key_times, dtype=np.float64)
+    key_poses = np.asarray(key_poses, dtype=np.float64)
+    query_times = np.asarray(query_times, dtype=np.float64)
+
+    if len(key_times) != len(key_poses):
+        raise ValueError("key_times and key_poses must have the same length")
+    if len(key_times) == 1:
+        return np.repeat(key_poses, len(query_times), axis=0)
+    if np.any(np.diff(key_times) <= 0):
+        raise ValueError("key_times must be strictly increasing")
+
+    segment = np.clip(np.searchsorted(key_times, query_times, side="right") - 1, 0, len(key_times) - 2)
+    t0, t1 = key_times[segment], key_times[segment + 1]
+    span = (t1 - t0)[:, None, None]
+    t = np.clip((query_times - t0) / (t1 - t0), 0.0, 1.0)[:, None, None]
+
+    # Translations: cubic Hermite with Catmull-Rom tangents
+    translations = key_poses[..., :3]
+    tangents = hermite_tangents(key_times, translations)
+    t2, t3 = t * t, t * t * t
+    translate = ((2 * t3 - 3 * t2 + 1) * translations[segment] +
+                 (t3 - 2 * t2 + t) * span * tangents[segment] +
+                 (-2 * t3 + 3 * t2) * translations[segment + 1] +
+                 (t3 - t2) * span * tangents[segment + 1])
+
+    # Rotations: squad between quaternion keys
+    rotations = key_poses[..., 3:]
+    quaternions = align_hemispheres(euler_to_quaternion(rotations))
+    controls = squad_control_points(quaternions)
+    rotate = quaternion_to_euler(squad(quaternions[segment], quaternions[segment + 1],
+                                       controls[segment], controls[segment + 1], t))
+
+    # Every rotation has two XYZ Euler triples, (x, y, z) and (x + 180, 180 - y, z + 180), and quaternion_to_euler
+    # returns the one with |y| <= 90. Pick, per joint and frame, the triple (unwrapped by multiples of 360) closest
+    # to the linear blend of the keys, so keys with |y| > 90 keep their own branch and the curves stay continuous.
+    reference = (1 - t) * rotations[segment] + t * rotations[segment + 1]
+    alternate = rotate * np.array([1.0, -1.0, 1.0]) + np.array([180.0, 180.0, 180.0])
+    candidates = []
+    for candidate in (rotate, alternate):
+        candidate = candidate + 360.0 * np.round((reference - candidate) / 360.0)
+        candidates.append((candidate, np.abs(candidate - reference).sum(axis=-1, keepdims=True)))
+    (principal, principal_distance), (other, other_distance) = candidates
+    rotate = np.where(other_distance < principal_distance, other, principal)
+
+    result = np.concatenate([translate, rotate], axis=-1)
+
+    # Query times that land on a key return the key itself
+    on_key = np.flatnonzero(np.isin(query_times, key_times))
+    result[on_key] = key_poses[np.searchsorted(key_times, query_times[on_key])]
+    return result
+
+
+def interpolate_in_betweens(start_frame, middle_frame, end_frame, key_frames):
+    """
+    Analytic counterpart of keyframe_interpolator.predict_intermediate_frames.
+
+    Parameters:
+    start_frame, middle_frame, end_frame (numpy.ndarray): Key poses of shape (joints, 6).
+    key_frames (list): Frame numbers of the three key poses.
+
+    Returns:
+    numpy.ndarray: Poses for every frame strictly between the first and last key,
+    shape (key_frames[-1] - key_frames[0] - 1, joints, 6).
+    """
+    query = np.arange(key_frames[0] + 1, key_frames[-1])
+    return interpolate_keys(key_frames, np.stack([start_frame, middle_frame, end_frame]), query)
+
+
+def rotation_angle(a, b):
+    """
+    Geodesic angle in degrees between two sets of XYZ Euler rotations.
+
+    Equivalent Euler triples of the same rotation are 0 degrees apart.
+    """
+    dot = np.abs(np.sum(euler_to_quaternion(a) * euler_to_quaternion(b), axis=-1))
+    return np.degrees(2 * np.arccos(np.clip(dot, 0.0, 1.0)))
+
+
+def holdout_error(clip, key_every=4):
+    """
+    Keep every `key_every`-th frame of a clip as keys and rebuild the rest.
+
+    Returns:
+    dict: RMS translation error, RMS geodesic rotation error (degrees) on the held-out frames and timing per frame.
+    """
+    key_index = np.arange(0, clip.num_frames, key_every)
+    if key_index[-1] != clip.num_frames - 1:
+        key_index = np.append(key_index, clip.num_frames - 1)
+    held_out = np.setdiff1d(np.arange(clip.num_frames), key_index)
+
+    started = time.perf_counter()
+    predicted = interpolate_keys(clip.frames[key_index], clip.poses[key_index], clip.frames[held_out])
+    seconds = time.perf_counter() - started
+
+    translate_error = predicted[..., :3] - clip.poses[held_out][..., :3]
+    rotate_error = rotation_angle(predicted[..., 3:], clip.poses[held_out][..., 3:])
+    return {
+        "clip"              : clip.name,
+        "held_out_frames"   : len(held_out),
+        "translate_rms"     : float(np.sqrt(np.mean(translate_error ** 2))),
+        "rotate_rms_deg"    : float(np.sqrt(np.mean(rotate_error ** 2))),
+        "us_per_frame"      : seconds / max(len(held_out), 1) * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    from motion_clips import load_clip
+
+    parser = argparse.ArgumentParser(description="Hold-out accuracy and speed of the analytic interpolator.")
+    parser.add_argument("clips", nargs="+", help="CSV or JSON motion clips")
+    parser.add_argument("--key-every", type=int, default=4)
+    args = parser.parse_args()
+
+    for path in args.clips:
+        result = holdout_error(load_clip(path), args.key_every)
+        print(f"{result['clip']}: {result['held_out_frames']} frames, "
+              f"translate RMS {result['translate_rms']:.4f}, rotate RMS {result['rotate_rms_deg']:.3f} deg, "
+              f"{result['us_per_frame']:.1f} us/frame")
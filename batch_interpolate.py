@@ -0,0 +1,253 @@
+"""
+Batch keyframe interpolation over many clips.
+
+Fans load -> validate -> interpolate -> export out over a process pool. The
+interpolator weights are placed once in a shared memory block; every worker
+maps the same block instead of receiving a pickled copy per task. Each worker
+writes its own output file, and results are reported as they complete.
+
+Usage:
+python batch_interpolate.py "captures/**/*.csv" "captures/**/*.json" --model keyframe_interpolator.npz --out interpolated
+"""
+import os
+import glob
+import time
+import logging
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from keyframe_interpolator import upsample_keys, upsample_times
+from keyframe_runtime import KeyframeRuntime
+from motion_clips import CHANNELS, MotionClip, load_clip, save_clip
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+THREAD_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+# Per-process state set up by _init_worker
+_worker_runtime = None
+_worker_memory = None
+
+
+def share_weights(runtime):
+    """
+    Copy a runtime's weights and normalization stats into one shared memory block.
+
+    Returns:
+    tuple: (SharedMemory, layout) where layout lists (offset, shape) for every array and
+    is all a worker needs, besides the block name, to rebuild the runtime.
+    """
+    arrays = runtime.get_weights() + [runtime.input_mean, runtime.input_std]
+    total = sum(array.nbytes for array in arrays)
+    memory = shared_memory.SharedMemory(create=True, size=max(total, 1))
+
+    layout, offset = [], 0
+    for array in arrays:
+        view = np.ndarray(array.shape, dtype=np.float32, buffer=memory.buf, offset=offset)
+        view[...] = array
+        layout.append((offset, array.shape))
+        offset += array.nbytes
+    return memory, layout
+
+
+def _attach_runtime(name, layout):
+    # Pool workers share the parent's resource tracker, so the parent stays responsible for unlinking
+    memory = shared_memory.SharedMemory(name=name)
+
+    arrays = [np.ndarray(shape, dtype=np.float32, buffer=memory.buf, offset=offset) for offset, shape in layout]
+    return memory, KeyframeRuntime(arrays[:-2], arrays[-2], arrays[-1])
+
+
+def _init_worker(memory_name, layout):
+    global _worker_runtime, _worker_memory
+    if memory_name is not None:
+        _worker_memory, _worker_runtime = _attach_runtime(memory_name, layout)
+
+
+@contextlib.contextmanager
+def thread_limits(threads):
+    """Set the BLAS/OpenMP thread variables while workers are being started, then restore the caller's values."""
+    saved = {variable: os.environ.get(variable) for variable in THREAD_VARIABLES}
+    os.environ.update({variable: str(threads) for variable in THREAD_VARIABLES})
+    try:
+        yield
+    finally:
+        for variable, value in saved.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+
+
+def validate_clip(clip, runtime):
+    """
+    Check a loaded clip before interpolating it.
+
+    Raises:
+    ValueError: If the clip cannot be interpolated.
+    """
+    if clip.num_frames < 2:
+        raise ValueError(f"{clip.name}: needs at least two key frames")
+    if not np.isfinite(clip.poses).all():
+        raise ValueError(f"{clip.name}: NaN or infinite values found")
+    if runtime is not None and runtime.input_dim != 3 * len(CHANNELS):
+        raise ValueError(f"{clip.name}: model expects {runtime.input_dim // 3} channels, clip has {len(CHANNELS)}")
+    if runtime is not None and len(np.unique(np.diff(clip.frames))) > 1:
+        raise ValueError(f"{clip.name}: the trained interpolator needs evenly spaced keys; "
+                         f"omit --model to interpolate uneven keys analytically")
+
+
+def process_clip(file_path, output_path, in_betweens):
+    """
+    Load, validate, interpolate and export one clip. Runs inside a worker process.
+
+    Returns:
+    dict: Per-stage timings in seconds and frame counts.
+    """
+    timings = {"clip": file_path}
+
+    started = time.perf_counter()
+    clip = load_clip(file_path)
+    timings["load"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    validate_clip(clip, _worker_runtime)
+    timings["validate"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    poses = upsample_keys(_worker_runtime, clip.poses, in_betweens, key_times=clip.frames)
+    frames = upsample_times(clip.frames, in_betweens)
+    if np.all(frames == np.round(frames)):
+        frames = frames.astype(np.int64)
+    labels = None if clip.labels is None else np.repeat(clip.labels, in_betweens + 1)[:len(poses)]
+    timings["interpolate"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    save_clip(MotionClip(clip.name, clip.joint_names, frames, poses, labels), output_path)
+    timings["export"] = time.perf_counter() - started
+
+    timings["output"] = output_path
+    timings["input_frames"] = clip.num_frames
+    timings["output_frames"] = len(poses)
+    return timings
+
+
+def expand_patterns(patterns):
+    """Expand glob patterns (recursive ** supported) to a sorted, de-duplicated list of clip files."""
+    paths = set()
+    for pattern in patterns:
+        paths.update(path for path in glob.glob(pattern, recursive=True)
+                     if path.lower().endswith((".csv", ".json")))
+    return sorted(paths)
+
+
+def output_paths(paths, output_dir):
+    """
+    Map every clip file to <output_dir>/<relative folder>/<stem>_interpolated.csv.
+
+    Folders are mirrored relative to the deepest folder containing all inputs, so clips
+    with the same file name in different folders do not overwrite each other.
+
+    Raises:
+    ValueError: If two inputs still map to the same output (e.g. X.csv next to X.json).
+    """
+    folders = [os.path.dirname(os.path.abspath(path)) for path in paths]
+    root = os.path.commonpath(folders) if folders else ""
+    outputs, sources = {}, {}
+    for path, folder in zip(paths, folders):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        output = os.path.normpath(os.path.join(output_dir, os.path.relpath(folder, root), f"{stem}_interpolated.csv"))
+        if output in sources:
+            raise ValueError(f"{sources[output]} and {path} would both be written to {output}")
+        sources[output] = path
+        outputs[path] = output
+    return outputs
+
+
+def run_batch(paths, output_dir, runtime=None, in_betweens=1, workers=None, threads_per_worker=1):
+    """
+    Interpolate every clip in `paths` with a process pool.
+
+    Parameters:
+    paths (list): Clip files to process.
+    output_dir (str): Directory receiving <clip>_interpolated.csv files, in the inputs' folder layout (see output_paths).
+    runtime (KeyframeRuntime, optional): Trained interpolator; analytic interpolation when None.
+    in_betweens (int): Frames inserted between consecutive keys. Default is 1.
+    workers (int, optional): Worker processes. Defaults to the CPU count.
+    threads_per_worker (int): BLAS threads per worker, so workers do not oversubscribe cores. Default is 1.
+        Workers are spawned rather than forked, so they load BLAS fresh with this limit in their environment.
+
+    Returns:
+    tuple: (results, failures, wall seconds)
+    """
+    outputs = output_paths(paths, output_dir)
+    memory, layout = share_weights(runtime) if runtime is not None else (None, None)
+    results, failures = [], []
+    started = time.perf_counter()
+
+    try:
+        # A forked worker inherits the parent's already initialized BLAS thread pool, so spawn them instead.
+        # Workers are started by submit(), so every worker exists once all clips are submitted.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker,
+                                 initargs=(memory.name if memory else None, layout)) as pool:
+            with thread_limits(threads_per_worker):
+                futures = {pool.submit(process_clip, path, outputs[path], in_betweens): path for path in paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.error(f"{path}: {e}")
+                    failures.append((path, str(e)))
+                    continue
+
+                results.append(result)
+                total = result["load"] + result["validate"] + result["interpolate"] + result["export"]
+                logging.info(f"{path}: {result['input_frames']} -> {result['output_frames']} frames in {total:.3f}s "
+                             f"(load {result['load']:.3f}, validate {result['validate']:.3f}, "
+                             f"interpolate {result['interpolate']:.3f}, export {result['export']:.3f})")
+    finally:
+        if memory is not None:
+            memory.close()
+            memory.unlink()
+
+    return results, failures, time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interpolate many motion clips in parallel.")
+    parser.add_argument("patterns", nargs="+", help="Glob patterns of CSV/JSON clips")
+    parser.add_argument("--out", default="interpolated", help="Output directory")
+    parser.add_argument("--model", help="Weights exported by export_model(); analytic interpolation if omitted")
+    parser.add_argument("--in-betweens", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    args = parser.parse_args()
+
+    paths = expand_patterns(args.patterns)
+    if not paths:
+        parser.error("No clips matched the given patterns")
+
+    try:
+        output_paths(paths, args.out)
+    except ValueError as e:
+        parser.error(str(e))
+
+    runtime = KeyframeRuntime.load(args.model) if args.model else None
+    results, failures, wall = run_batch(paths, args.out, runtime, args.in_betweens,
+                                        args.workers, args.threads_per_worker)
+
+    frames = sum(result["output_frames"] for result in results)
+    print(f"Processed {len(results)}/{len(paths)} clips with {args.workers} workers in {wall:.2f}s: "
+          f"{len(results) / wall:.1f} clips/s, {frames / wall:.0f} output frames/s")
+    if failures:
+        print(f"{len(failures)} clips failed:")
+        for path, error in failures:
+            print(f"  {path}: {error}")
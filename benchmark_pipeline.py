@@ -0,0 +1,292 @@
+"""
+Benchmark suite for the keyframe ML pipeline.
+
+Times every stage of the pipeline on the bundled clips and on synthetic
+scale-ups of one of them (frames and/or joints tiled N times), records the
+peak Python/NumPy memory of each stage with tracemalloc, and compares the
+results with a stored baseline JSON to flag regressions. Everything runs on
+the CPU; GPUs are hidden from TensorFlow, and the TensorFlow stages are
+skipped when it is not installed.
+
+Stages:
+- csv_load        : pandas.read_csv / json.load of the clip file
+- frame_filter    : prepare_frame_data() for the start, middle and end key frames
+- validate        : the NaN/Inf checks on the key poses
+- train_epoch     : one Keras training epoch on every key window of the clip (TensorFlow only)
+- predict_keras   : model.predict over every window's in-betweens (TensorFlow only)
+- predict_numpy   : KeyframeRuntime over the same rows, via upsample_keys()
+- analytic        : analytic spline/squad interpolation of the same frames
+- csv_write       : save_interpolated_keyframes_to_csv() of the interpolated frames
+
+The 100x scale-ups only run with --full; on a single core the CSV writer
+alone takes minutes at that size.
+
+Usage:
+python benchmark_pipeline.py --save-baseline benchmark_baseline.json
+python benchmark_pipeline.py --baseline benchmark_baseline.json --tolerance 0.25
+"""
+import os
+
+# CPU-only and reproducible; must be set before TensorFlow is imported anywhere
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from keyframe_interpolator import (DEFAULT_HYPERPARAMS, blend_inputs, build_model, check_finite, normalization_stats,
+                                   prepare_frame_data, save_interpolated_keyframes_to_csv, tensorflow_available,
+                                   upsample_keys)
+from keyframe_runtime import KeyframeRuntime
+from analytic_interpolation import interpolate_keys
+from motion_clips import MotionClip, clip_to_dataframe, load_clip
+
+BUNDLED_CLIPS = ["Walking_A.csv", "Walking_C.csv", "Walking_D.csv", "animation_data.json"]
+DEFAULT_SCALES = ["10x1", "1x10"]
+FULL_SCALES = DEFAULT_SCALES + ["100x1", "1x100"]
+
+
+def measure(function, repeat=3, max_seconds=2.0):
+    """
+    Time a stage and record its peak traced memory.
+
+    Runs `function` up to `repeat` times (fewer when a run takes over `max_seconds`) and
+    keeps the median time, then runs it once more under tracemalloc for the memory peak,
+    so tracing overhead never inflates the timings.
+
+    Returns:
+    tuple: (result of the last run, {"seconds": ..., "peak_mb": ...})
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - started)
+        if times[-1] > max_seconds:
+            break
+
+    gc.collect()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {"seconds": float(np.median(times)), "peak_mb": peak / 2 ** 20}
+
+
+def scale_clip(clip, frame_factor=1, joint_factor=1):
+    """Tile a clip's frames and/or joints to build a larger synthetic clip."""
+    poses = np.tile(clip.poses, (frame_factor, joint_factor, 1))
+    joint_names = [name if copy == 0 else f"{name}_{copy}"
+                   for copy in range(joint_factor) for name in clip.joint_names]
+    frames = clip.frames[0] + np.arange(len(poses))
+    labels = None if clip.labels is None else np.tile(clip.labels, frame_factor)
+    return MotionClip(f"{clip.name}_{frame_factor}x{joint_factor}", joint_names, frames, poses, labels)
+
+
+def random_runtime(hyperparams, seed=0):
+    """A KeyframeRuntime with the pipeline's architecture and seeded random weights; speed does not depend on values."""
+    rng = np.random.default_rng(seed)
+    sizes = [18] + list(hyperparams["hidden_units"]) + [6]
+    weights = []
+    for fan_in, fan_out in zip(sizes[:-1], sizes[1:]):
+        weights.append(rng.normal(scale=np.sqrt(2 / fan_in), size=(fan_in, fan_out)).astype(np.float32))
+        weights.append(np.zeros(fan_out, np.float32))
+    return KeyframeRuntime(weights)
+
+
+def window_rows(keys, in_betweens):
+    """Training inputs/targets and blended prediction inputs for every start/middle/end window of a clip."""
+    starts = np.arange(0, len(keys) - 2, 2)
+    channels = keys.shape[-1]
+    start, middle, end = (keys[starts + i].reshape(-1, channels) for i in range(3))
+    train_inputs = np.concatenate([start, middle, end], axis=1)
+    blended = blend_inputs(start, middle, end, 2 * in_betweens + 1)
+    return train_inputs, start, blended.reshape(-1, blended.shape[-1])
+
+
+def benchmark_clip(clip, file_path, args, use_tensorflow):
+    """
+    Run every stage on one clip.
+
+    Returns:
+    dict: Stage name -> {"seconds", "peak_mb"}, plus the clip size under "_size".
+    """
+    stages = {"_size": {"frames": clip.num_frames, "joints": clip.num_joints}}
+    hyperparams = DEFAULT_HYPERPARAMS
+
+    if file_path.lower().endswith(".json"):
+        def load():
+            with open(file_path, "r") as file:
+                return json.load(file)
+    else:
+        def load():
+            return pd.read_csv(file_path)
+    _, stages["csv_load"] = measure(load, args.repeat)
+
+    # The pipeline's keyframe CSVs carry pose columns only
+    data = clip_to_dataframe(clip).drop(columns=["Label"], errors="ignore")
+    key_frames = [clip.frames[0], clip.frames[clip.num_frames // 2], clip.frames[-1]]
+    key_poses, stages["frame_filter"] = measure(lambda: [prepare_frame_data(data, f)[1] for f in key_frames],
+                                                args.repeat)
+    key_poses = [poses.astype(float) for poses in key_poses]
+    _, stages["validate"] = measure(lambda: [check_finite(poses, f"frame_{i}") for i, poses in enumerate(key_poses)],
+                                    args.repeat)
+
+    runtime = random_runtime(hyperparams)
+    if use_tensorflow and clip.num_frames >= 3:
+        train_inputs, train_target, predict_inputs = window_rows(clip.poses, args.in_betweens)
+        input_mean, input_std = normalization_stats(train_inputs)
+        normalized = (train_inputs - input_mean) / input_std
+
+        model = build_model(train_inputs.shape[1], train_target.shape[1], hyperparams["hidden_units"])
+        model.compile(optimizer=hyperparams["optimizer"], loss=hyperparams["loss"])
+        model.fit(normalized[:1], train_target[:1], epochs=1, verbose=0)   # build and trace outside the timing
+        _, stages["train_epoch"] = measure(lambda: model.fit(normalized, train_target, epochs=1, verbose=0),
+                                           args.repeat)
+
+        scaled = ((predict_inputs - input_mean) / input_std).astype(np.float32)
+        _, stages["predict_keras"] = measure(lambda: model.predict(scaled, batch_size=4096, verbose=0), args.repeat)
+        runtime = KeyframeRuntime(model.get_weights(), input_mean, input_std)
+
+    interpolated = clip.poses
+    if clip.num_frames >= 3:
+        interpolated, stages["predict_numpy"] = measure(lambda: upsample_keys(runtime, clip.poses, args.in_betweens),
+                                                        args.repeat)
+
+        step = args.in_betweens + 1
+        key_times = np.arange(clip.num_frames) * step
+        output_times = np.arange(len(interpolated))
+        _, stages["analytic"] = measure(lambda: interpolate_keys(key_times, clip.poses, output_times), args.repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        output_path = os.path.join(directory, "interpolated_keyframes.csv")
+        _, stages["csv_write"] = measure(lambda: save_interpolated_keyframes_to_csv(
+            clip.joint_names, interpolated, -1, len(interpolated), output_path), args.repeat)
+
+    return stages
+
+
+def run_suite(args):
+    """
+    Benchmark the bundled clips and the synthetic scale-ups.
+
+    Returns:
+    dict: {"meta": {...}, "results": {case: stages}}
+    """
+    use_tensorflow = not args.no_tensorflow and tensorflow_available()
+    results = {}
+
+    for file_path in args.clips:
+        clip = load_clip(file_path)
+        print(f"Benchmarking {clip} ...", flush=True)
+        results[clip.name] = benchmark_clip(clip, file_path, args, use_tensorflow)
+
+    source = load_clip(args.scale_source)
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scales:
+            frame_factor, joint_factor = (int(part) for part in scale.lower().split("x"))
+            clip = scale_clip(source, frame_factor, joint_factor)
+            file_path = os.path.join(directory, clip.name + ".csv")
+            clip_to_dataframe(clip).to_csv(file_path, index=False)
+            print(f"Benchmarking synthetic {clip} ...", flush=True)
+            results[clip.name] = benchmark_clip(clip, file_path, args, use_tensorflow)
+            os.remove(file_path)
+
+    meta = {
+        "python"        : sys.version.split()[0],
+        "numpy"         : np.__version__,
+        "pandas"        : pd.__version__,
+        "platform"      : platform.platform(),
+        "processor"     : platform.processor() or platform.machine(),
+        "tensorflow"    : use_tensorflow,
+        "in_betweens"   : args.in_betweens,
+        "repeat"        : args.repeat,
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(current, baseline, tolerance, min_seconds=0.005):
+    """
+    Compare a run with a baseline.
+
+    A stage regresses when it is more than `tolerance` (fractional) slower or uses more
+    than `tolerance` more peak memory than the baseline. Stages faster than `min_seconds`
+    in both runs are too noisy to judge on time.
+
+    Returns:
+    list: (case, stage, metric, baseline value, current value) for every regression.
+    """
+    regressions = []
+    for case, stages in current["results"].items():
+        for stage, values in stages.items():
+            reference = baseline.get("results", {}).get(case, {}).get(stage)
+            if stage.startswith("_") or not reference:
+                continue
+            slow = max(values["seconds"], reference["seconds"]) >= min_seconds
+            if slow and values["seconds"] > reference["seconds"] * (1 + tolerance):
+                regressions.append((case, stage, "seconds", reference["seconds"], values["seconds"]))
+            if values["peak_mb"] > reference["peak_mb"] * (1 + tolerance) + 0.5:
+                regressions.append((case, stage, "peak_mb", reference["peak_mb"], values["peak_mb"]))
+    return regressions
+
+
+def print_results(results):
+    print(f"\n{'case':<24}{'stage':<16}{'seconds':>12}{'peak MB':>12}")
+    for case, stages in results["results"].items():
+        size = stages["_size"]
+        print(f"{case} ({size['frames']} frames x {size['joints']} joints)")
+        for stage, values in stages.items():
+            if not stage.startswith("_"):
+                print(f"{'':<24}{stage:<16}{values['seconds']:>12.4f}{values['peak_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the keyframe ML pipeline.")
+    parser.add_argument("--clips", nargs="*", default=BUNDLED_CLIPS, help="Clips benchmarked as-is")
+    parser.add_argument("--scale-source", default="Walking_A.csv", help="Clip tiled for the synthetic scale-ups")
+    parser.add_argument("--scales", nargs="*", default=DEFAULT_SCALES,
+                        help="Synthetic scale-ups as <frame factor>x<joint factor>, e.g. 100x1 1x100")
+    parser.add_argument("--full", action="store_true", help=f"Run every scale-up in {FULL_SCALES}")
+    parser.add_argument("--in-betweens", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-tensorflow", action="store_true", help="Skip the training and Keras stages")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed fractional slowdown / memory growth")
+    parser.add_argument("--save-baseline", help="Write this run's results to a baseline JSON")
+    parser.add_argument("--output", help="Write this run's results to a JSON file")
+    args = parser.parse_args()
+    if args.full:
+        args.scales = FULL_SCALES
+
+    results = run_suite(args)
+    print_results(results)
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        if baseline.get("meta", {}).get("processor") != results["meta"]["processor"]:
+            print("Warning: baseline was recorded on a different processor; timings may not be comparable.")
+
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for case, stage, metric, before, after in regressions:
+                print(f"  {case} / {stage}: {metric} {before:.4f} -> {after:.4f}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
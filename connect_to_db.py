@@ -16,6 +16,9 @@ class MongoDatabase:
         self.db = None
         self.activity_collection = None
         self.summary_collection = None
+        self.rollup_collection = None
+        self.rollup_state_collection = None
+        self.teams = {}
         self.username = getpass.getuser()  # Get current logged-in user
 
         self.load_config()
@@ -36,6 +39,7 @@ class MongoDatabase:
             self.password = config["mongodb"].get("password")
             self.auth_db = config["mongodb"]["auth_db"]
             self.db_name = config["mongodb"]["db_name"]
+            self.teams = config.get("teams") or {}  # Optional team -> usernames map for rollup reports
 
             logging.info("Configuration loaded successfully.")
 
@@ -60,6 +64,8 @@ class MongoDatabase:
             self.db = self.client[self.db_name]
             self.activity_collection = self.db["activity_logs"]
             self.summary_collection = self.db["session_summaries"]
+            self.rollup_collection = self.db["activity_rollups"]
+            self.rollup_state_collection = self.db["rollup_state"]
 
             logging.info(f"Connected to MongoDB successfully. Database: {self.db_name}")
 
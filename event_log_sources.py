@@ -0,0 +1,314 @@
+"""
+Event log sources used by EventDetector.
+
+A source yields event objects exposing the same attributes as pywin32's
+event records (RecordNumber, EventID, TimeGenerated, StringInserts), so the
+detector's parsing and filtering code is identical for every backend:
+
+- Win32EventLogSource  : the live Windows event log, read through pywin32
+- ReplayEventLogSource : events exported to XML (wevtutil qe Security /f:xml)
+                         or JSON (Get-WinEvent | ConvertTo-Json, or the plain
+                         format written by write_replay_file), so the detector
+                         can be tested and benchmarked on any platform
+
+Both sources read incrementally: read_forwards() only returns events newer
+than a given record number, and event IDs are filtered before an event
+object is built.
+"""
+import os
+import re
+import json
+import bisect
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+# Module logger, so building a source never configures the root logger before the detector does
+logger = logging.getLogger(__name__)
+
+
+class LogEvent:
+    """An event record with the attribute names of pywin32's PyEventLogRecord."""
+    __slots__ = ("RecordNumber", "EventID", "TimeGenerated", "StringInserts")
+
+    def __init__(self, record_number, event_id, time_generated, string_inserts):
+        self.RecordNumber   = record_number
+        self.EventID        = event_id
+        self.TimeGenerated  = time_generated
+        self.StringInserts  = string_inserts
+
+    def to_dict(self):
+        return {
+            "record_number" : self.RecordNumber,
+            "event_id"      : self.EventID,
+            "time_generated": self.TimeGenerated.isoformat(),
+            "string_inserts": list(self.StringInserts or []),
+        }
+
+
+# ===================================================================================================================================
+# Live Windows event log
+# ===================================================================================================================================
+class Win32EventLogSource:
+    def __init__(self, server="localhost", log_type="Security"):
+        """
+        Initializes the Win32EventLogSource object. pywin32 is imported here, so the module stays importable elsewhere.
+
+        Parameters:
+        - server (str): Machine whose log is read. Default is "localhost".
+        - log_type (str): Event log name. Default is "Security".
+        """
+        import win32evtlog
+        import win32security
+
+        self.win32evtlog    = win32evtlog
+        self.win32security  = win32security
+        self.server         = server
+        self.log_type       = log_type
+        self.handle         = None
+
+    @property
+    def identity(self):
+        """Identifies the log a bookmark belongs to."""
+        return f"win32:{self.server}:{self.log_type}"
+
+    def _open(self):
+        # The handle is kept open between polls and reopened only after an error
+        if self.handle is None:
+            self.handle = self.win32evtlog.OpenEventLog(self.server, self.log_type)
+        return self.handle
+
+    def close(self):
+        if self.handle is not None:
+            try:
+                self.win32evtlog.CloseEventLog(self.handle)
+            except Exception:
+                pass
+            self.handle = None
+
+    def record_range(self):
+        """Return (oldest, newest) record numbers currently in the log, or (0, 0) when it is empty."""
+        handle = self._open()
+        try:
+            oldest = self.win32evtlog.GetOldestEventLogRecord(handle)
+            count = self.win32evtlog.GetNumberOfEventLogRecords(handle)
+        except Exception:
+            self.close()
+            raise
+        return (oldest, oldest + count - 1) if count else (0, 0)
+
+    def _read(self, flags, offset=0):
+        handle = self._open()
+        try:
+            return self.win32evtlog.ReadEventLog(handle, flags, offset)
+        except Exception:
+            self.close()
+            raise
+
+    def read_backwards(self, event_ids=None, limit=None):
+        """Yield events newest first, examining at most `limit` records."""
+        flags = self.win32evtlog.EVENTLOG_BACKWARDS_READ | self.win32evtlog.EVENTLOG_SEQUENTIAL_READ
+        # A fresh handle starts reading at the newest record
+        self.close()
+        examined = 0
+        while limit is None or examined < limit:
+            chunk = self._read(flags)
+            if not chunk:
+                break
+            for event in chunk:
+                examined += 1
+                if event_ids is None or event.EventID in event_ids:
+                    yield event
+                if limit is not None and examined >= limit:
+                    break
+
+    def read_forwards(self, after_record, event_ids=None):
+        """Yield events with a record number above `after_record`, oldest first."""
+        oldest, newest = self.record_range()
+        if newest == 0 or newest <= after_record:
+            return
+
+        # Seek straight to the first unread record; start at the oldest one if the log was cleared or wrapped
+        first = max(after_record + 1, oldest)
+        flags = self.win32evtlog.EVENTLOG_FORWARDS_READ | self.win32evtlog.EVENTLOG_SEEK_READ
+        chunk = self._read(flags, first)
+        flags = self.win32evtlog.EVENTLOG_FORWARDS_READ | self.win32evtlog.EVENTLOG_SEQUENTIAL_READ
+        while chunk:
+            for event in chunk:
+                if event.RecordNumber > after_record and (event_ids is None or event.EventID in event_ids):
+                    yield event
+            chunk = self._read(flags)
+
+    def lookup_sid(self, sid_str):
+        """Resolve a SID string to an account name, or None if it cannot be resolved."""
+        try:
+            sid = self.win32security.ConvertStringSidToSid(sid_str)
+            name, domain, _ = self.win32security.LookupAccountSid(None, sid)
+            return name
+        except Exception:
+            return None
+
+
+# ===================================================================================================================================
+# Replay of exported events
+# ===================================================================================================================================
+_XML_NAMESPACE = re.compile(r"^\{[^}]*\}")
+_DOTNET_DATE = re.compile(r"/Date\((-?\d+)\)/")
+
+
+def parse_event_time(value):
+    """
+    Parse an exported timestamp into a naive local datetime, like pywin32's TimeGenerated.
+
+    Accepts ISO 8601 (as written by wevtutil, with up to 7 fractional digits) and
+    .NET "/Date(milliseconds)/" values from ConvertTo-Json.
+    """
+    match = _DOTNET_DATE.search(value)
+    if match:
+        moment = datetime.fromtimestamp(int(match.group(1)) / 1000, tz=timezone.utc)
+    else:
+        text = value.strip().replace("Z", "+00:00")
+        text = re.sub(r"(\.\d{6})\d+", r"\1", text)
+        moment = datetime.fromisoformat(text)
+        if moment.tzinfo is None:
+            return moment
+    return moment.astimezone().replace(tzinfo=None)
+
+
+def _local_name(tag):
+    return _XML_NAMESPACE.sub("", tag)
+
+
+def _parse_xml_event(element, event_ids):
+    system = next((child for child in element if _local_name(child.tag) == "System"), None)
+    if system is None:
+        return None
+
+    fields = {_local_name(child.tag): child for child in system}
+    event_id = int(fields["EventID"].text)
+    if event_ids is not None and event_id not in event_ids:
+        return None   # Filtered before the timestamp and EventData are parsed
+
+    record_number = int(fields["EventRecordID"].text)
+    time_generated = parse_event_time(fields["TimeCreated"].get("SystemTime"))
+    inserts = []
+    for child in element:
+        if _local_name(child.tag) in ("EventData", "UserData"):
+            inserts = [data.text or "" for data in child.iter() if _local_name(data.tag) == "Data"]
+    return LogEvent(record_number, event_id, time_generated, inserts)
+
+
+def _parse_json_event(entry, event_ids):
+    event_id = entry.get("event_id", entry.get("EventID", entry.get("Id")))
+    if event_id is None:
+        return None
+    event_id = int(event_id)
+    if event_ids is not None and event_id not in event_ids:
+        return None
+
+    record_number = int(entry.get("record_number", entry.get("RecordNumber", entry.get("RecordId", 0))))
+    time_value = entry.get("time_generated", entry.get("TimeGenerated", entry.get("TimeCreated")))
+    if "Properties" in entry:
+        inserts = [str(item.get("Value", "")) if isinstance(item, dict) else str(item)
+                   for item in entry["Properties"] or []]
+    else:
+        inserts = list(entry.get("string_inserts", entry.get("StringInserts")) or [])
+    return LogEvent(record_number, event_id, parse_event_time(str(time_value)), inserts)
+
+
+def load_replay_events(file_path, event_ids=None):
+    """
+    Load exported events from an XML or JSON file.
+
+    Parameters:
+    file_path (str): .xml export (with or without an enclosing root element) or .json export.
+    event_ids (set, optional): Only events with these IDs are parsed.
+
+    Returns:
+    list: LogEvent objects sorted by record number.
+    """
+    events = []
+    if file_path.lower().endswith(".json"):
+        with open(file_path, "r", encoding="utf-8-sig") as file:
+            data = json.load(file)
+        entries = data.get("events", []) if isinstance(data, dict) else data
+        events = [_parse_json_event(entry, event_ids) for entry in entries]
+    else:
+        # wevtutil writes bare <Event> elements one after another; wrap them so the file parses as one document
+        with open(file_path, "r", encoding="utf-8-sig") as file:
+            text = re.sub(r"<\?xml[^>]*\?>", "", file.read())
+        root = ET.fromstring(f"<Events>{text}</Events>")
+        elements = [element for element in root.iter() if _local_name(element.tag) == "Event"]
+        events = [_parse_xml_event(element, event_ids) for element in elements]
+
+    events = [event for event in events if event is not None]
+    events.sort(key=lambda event: event.RecordNumber)
+    return events
+
+
+class ReplayEventLogSource:
+    def __init__(self, file_path, sid_names=None, reload=True):
+        """
+        Initializes the ReplayEventLogSource object.
+
+        Parameters:
+        - file_path (str): XML or JSON export to replay.
+        - sid_names (dict): Optional SID string -> account name map used by lookup_sid().
+        - reload (bool): Re-read the file when its modification time changes, so appending
+          to the export simulates new events arriving. Default is True.
+        """
+        self.file_path  = file_path
+        self.sid_names  = dict(sid_names or {})
+        self.reload     = reload
+        self.mtime      = None
+        self.events     = []
+        self.records    = []
+        self._load()
+
+    @property
+    def identity(self):
+        """Identifies the log a bookmark belongs to."""
+        return f"replay:{os.path.abspath(self.file_path)}"
+
+    def _load(self):
+        self.mtime = os.path.getmtime(self.file_path)
+        self.events = load_replay_events(self.file_path)
+        self.records = [event.RecordNumber for event in self.events]
+        logger.info(f"Loaded {len(self.events)} events from {self.file_path}")
+
+    def _refresh(self):
+        if self.reload and os.path.getmtime(self.file_path) != self.mtime:
+            self._load()
+
+    def close(self):
+        pass
+
+    def record_range(self):
+        self._refresh()
+        return (self.records[0], self.records[-1]) if self.records else (0, 0)
+
+    def read_backwards(self, event_ids=None, limit=None):
+        self._refresh()
+        stop = 0 if limit is None else max(len(self.events) - limit, 0)
+        for index in range(len(self.events) - 1, stop - 1, -1):
+            event = self.events[index]
+            if event_ids is None or event.EventID in event_ids:
+                yield event
+
+    def read_forwards(self, after_record, event_ids=None):
+        self._refresh()
+        for index in range(bisect.bisect_right(self.records, after_record), len(self.events)):
+            event = self.events[index]
+            if event_ids is None or event.EventID in event_ids:
+                yield event
+
+    def lookup_sid(self, sid_str):
+        return self.sid_names.get(sid_str)
+
+
+def write_replay_file(events, file_path):
+    """Write events (LogEvent or pywin32 records) to the plain JSON replay format."""
+    records = [LogEvent(event.RecordNumber, event.EventID, event.TimeGenerated, event.StringInserts).to_dict()
+               for event in events]
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump({"events": records}, file)
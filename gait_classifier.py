@@ -0,0 +1,256 @@
+"""
+Streaming sliding-window gait/label classifier.
+
+Poses are consumed one frame at a time. Each frame is reduced to a small
+vector (sin/cos of the key joints' rotations plus the root height), pushed
+into a fixed-size ring buffer, and the window features are updated
+incrementally in O(dims) per frame:
+
+- running sums and sums of squares give the window mean and variance
+- a sliding DFT keeps the first few frequency bins, giving spectral energy
+
+The accumulated sums are recomputed from the buffer every `resync_every`
+frames so rounding errors cannot build up on long streams. A Gaussian naive
+Bayes model over the window features emits a label and confidence per frame.
+
+Usage:
+python gait_classifier.py Walking_A.csv Walking_C.csv Walking_D.csv animation_data.json
+"""
+import time
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from motion_clips import CHANNELS, load_clip
+
+DEFAULT_JOINTS = ["Hips", "Spine", "LeftUpLeg", "RightUpLeg", "LeftLeg", "RightLeg",
+                  "LeftFoot", "RightFoot", "LeftArm", "RightArm"]
+
+
+class SlidingWindowFeatures:
+    def __init__(self, dims, window=32, bins=3, resync_every=1024):
+        """
+        Initializes the SlidingWindowFeatures object.
+
+        Parameters:
+        - dims (int): Size of the per-frame vectors.
+        - window (int): Frames in the ring buffer. Default is 32.
+        - bins (int): Sliding DFT frequency bins kept (1..bins). Default is 3.
+        - resync_every (int): Recompute the running sums from the buffer every this many frames. Default is 1024.
+        """
+        self.dims           = dims
+        self.window         = window
+        self.bins           = bins
+        self.resync_every   = resync_every
+
+        # Per-frame rotation of each bin: X_k(t) = (X_k(t-1) - x_out + x_in) * exp(2j * pi * k / window)
+        self.twiddle = np.exp(2j * np.pi * np.arange(1, bins + 1) / window)[:, None]
+        self.reset()
+
+    @property
+    def feature_size(self):
+        return self.dims * (2 + self.bins)
+
+    def reset(self):
+        self.buffer     = np.zeros((self.window, self.dims))
+        self.position   = 0
+        self.count      = 0
+        self.pushed     = 0
+        self.sum        = np.zeros(self.dims)
+        self.sum_sq     = np.zeros(self.dims)
+        self.spectrum   = np.zeros((self.bins, self.dims), dtype=complex)
+
+    def _resync(self):
+        # Buffer contents ordered newest first: x_t, x_{t-1}, ...
+        newest_first = self.buffer[(self.position - 1 - np.arange(self.window)) % self.window]
+        self.sum = newest_first.sum(axis=0)
+        self.sum_sq = np.square(newest_first).sum(axis=0)
+        phases = np.exp(2j * np.pi * np.outer(np.arange(1, self.bins + 1), np.arange(1, self.window + 1)) / self.window)
+        self.spectrum = phases @ newest_first
+
+    def push(self, x):
+        """
+        Add one frame vector and return the updated window features.
+
+        Returns:
+        numpy.ndarray: Concatenated window mean, variance and spectral energy of each bin.
+        """
+        outgoing = self.buffer[self.position].copy()
+        self.buffer[self.position] = x
+        self.position = (self.position + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+        self.pushed += 1
+
+        self.sum += x - outgoing
+        self.sum_sq += x * x - outgoing * outgoing
+        self.spectrum = (self.spectrum + (x - outgoing)) * self.twiddle
+        if self.pushed % self.resync_every == 0:
+            self._resync()
+
+        mean = self.sum / self.count
+        variance = np.maximum(self.sum_sq / self.count - mean * mean, 0.0)
+        energy = np.abs(self.spectrum) ** 2 / (self.count * self.count)
+        return np.concatenate([mean, variance, energy.ravel()])
+
+
+class GaussianNaiveBayes:
+    def __init__(self, var_smoothing=1e-6):
+        self.var_smoothing = var_smoothing
+
+    def fit(self, features, labels):
+        labels = np.asarray(labels)
+        self.classes = np.unique(labels)
+        self.means = np.stack([features[labels == c].mean(axis=0) for c in self.classes])
+        variance = np.stack([features[labels == c].var(axis=0) for c in self.classes])
+        self.variances = variance + self.var_smoothing * max(float(features.var(axis=0).max()), 1e-12)
+        self.log_priors = np.log(np.array([np.mean(labels == c) for c in self.classes]))
+        self._log_norm = -0.5 * np.log(2 * np.pi * self.variances).sum(axis=1)
+        return self
+
+    def predict_proba(self, features):
+        """
+        Returns:
+        numpy.ndarray: Class probabilities of shape (samples, classes), columns ordered as self.classes.
+        """
+        features = np.atleast_2d(features)
+        log_likelihood = -0.5 * (((features[:, None, :] - self.means) ** 2) / self.variances).sum(axis=2)
+        log_posterior = log_likelihood + self._log_norm + self.log_priors
+        log_posterior -= log_posterior.max(axis=1, keepdims=True)
+        probabilities = np.exp(log_posterior)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+
+def default_label(clip_name):
+    """Label for clips without a Label column, e.g. "Walking_C" -> "walkingC" (matching Walking_A's "walkingA")."""
+    first, *rest = clip_name.split("_")
+    return first.lower() + "".join(rest)
+
+
+def frame_labels(clip):
+    """Per-frame labels of a clip, falling back to default_label() when the clip has none."""
+    if clip.labels is not None:
+        return clip.labels
+    return np.full(clip.num_frames, default_label(clip.name), dtype=object)
+
+
+class StreamingGaitClassifier:
+    def __init__(self, joint_names, joints=None, window=32, bins=3, root_joint="Hips"):
+        """
+        Initializes the StreamingGaitClassifier object.
+
+        Parameters:
+        - joint_names (list): Joint order of the incoming poses.
+        - joints (list): Joints whose rotations are used. Default is DEFAULT_JOINTS.
+        - window (int): Sliding window length in frames. Default is 32.
+        - bins (int): Spectral bins per channel. Default is 3.
+        - root_joint (str): Joint whose height (translate Y) is also used. Default is "Hips".
+        """
+        self.joint_names    = list(joint_names)
+        self.joints         = list(joints or DEFAULT_JOINTS)
+        self.joint_index    = np.array([self.joint_names.index(joint) for joint in self.joints])
+        self.root_index     = self.joint_names.index(root_joint) if root_joint in self.joint_names else None
+
+        dims = 6 * len(self.joints) + (self.root_index is not None)
+        self.features   = SlidingWindowFeatures(dims, window, bins)
+        self.model      = None
+        self.last_label = None
+
+    def frame_vector(self, pose):
+        """Reduce a (joints, 6) pose to the per-frame vector. sin/cos keeps rotations continuous across wraps."""
+        angles = np.radians(pose[self.joint_index, 3:]).ravel()
+        parts = [np.sin(angles), np.cos(angles)]
+        if self.root_index is not None:
+            parts.append(pose[self.root_index, CHANNELS.index("translate_y"):CHANNELS.index("translate_y") + 1])
+        return np.concatenate(parts)
+
+    def reset(self):
+        """Clear the window, e.g. when a new stream starts."""
+        self.features.reset()
+
+    def _stream_features(self, poses):
+        self.reset()
+        return np.stack([self.features.push(self.frame_vector(pose)) for pose in poses])
+
+    def fit(self, segments):
+        """
+        Train from (poses, labels) segments, each streamed from an empty window.
+
+        Parameters:
+        segments (list): (poses of shape (frames, joints, 6), per-frame labels) pairs.
+        """
+        features = np.concatenate([self._stream_features(poses) for poses, _ in segments])
+        labels = np.concatenate([np.asarray(labels) for _, labels in segments])
+        self.model = GaussianNaiveBayes().fit(features, labels)
+        self.reset()
+        return self
+
+    def update(self, pose):
+        """
+        Consume one frame.
+
+        Returns:
+        tuple: (label, confidence) for the current window.
+        """
+        probabilities = self.model.predict_proba(self.features.push(self.frame_vector(pose)))[0]
+        best = int(np.argmax(probabilities))
+        self.last_label = self.model.classes[best]
+        return self.last_label, float(probabilities[best])
+
+
+def evaluate(clips, train_fraction=0.7, window=32, bins=3):
+    """
+    Train on the first part of every clip and stream the held-out remainder.
+
+    Returns:
+    tuple: (classifier, report) where report holds per-clip and overall accuracy and frames per second.
+    """
+    train, test = [], []
+    for clip in clips:
+        labels = frame_labels(clip)
+        split = max(1, int(clip.num_frames * train_fraction))
+        train.append((clip.poses[:split], labels[:split]))
+        test.append((clip.name, clip.poses[split:], labels[split:]))
+
+    classifier = StreamingGaitClassifier(clips[0].joint_names, window=window, bins=bins).fit(train)
+
+    report = {"clips": {}}
+    correct = total = 0
+    seconds = 0.0
+    for name, poses, labels in test:
+        classifier.reset()
+        started = time.perf_counter()
+        predicted = [classifier.update(pose) for pose in poses]
+        seconds += time.perf_counter() - started
+
+        hits = sum(label == expected for (label, _), expected in zip(predicted, labels))
+        confidence = float(np.mean([c for _, c in predicted])) if predicted else 0.0
+        report["clips"][name] = {
+            "frames"            : len(poses),
+            "accuracy"          : hits / len(poses) if len(poses) else 0.0,
+            "mean_confidence"   : confidence,
+            "predicted"         : dict(Counter(label for label, _ in predicted)),
+        }
+        correct += hits
+        total += len(poses)
+
+    report["accuracy"] = correct / total if total else 0.0
+    report["frames_per_second"] = total / seconds if seconds else 0.0
+    return classifier, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Held-out accuracy and throughput of the streaming gait classifier.")
+    parser.add_argument("clips", nargs="+", help="CSV or JSON motion clips")
+    parser.add_argument("--window", type=int, default=32)
+    parser.add_argument("--bins", type=int, default=3)
+    parser.add_argument("--train-fraction", type=float, default=0.7)
+    args = parser.parse_args()
+
+    clips = [load_clip(path) for path in args.clips]
+    classifier, report = evaluate(clips, args.train_fraction, args.window, args.bins)
+
+    for name, result in report["clips"].items():
+        print(f"{name}: {result['frames']} held-out frames, accuracy {result['accuracy']:.1%}, "
+              f"mean confidence {result['mean_confidence']:.2f}, predicted {result['predicted']}")
+    print(f"Overall held-out accuracy {report['accuracy']:.1%}, {report['frames_per_second']:.0f} frames/s")
@@ -0,0 +1,70 @@
+"""
+Load generator for interpolation_service.
+
+Fires concurrent /interpolate requests with random key poses, then prints
+client-side latency percentiles, throughput and the service's own queue
+latency and batch size histograms.
+
+Usage:
+python interpolation_loadgen.py --requests 2000 --concurrency 32 --joints 65
+"""
+import json
+import time
+import argparse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def post_json(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode(),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def run_load(url, requests, concurrency, joints, num_intermediate_frames, seed=0):
+    """
+    Send `requests` interpolation requests from `concurrency` threads.
+
+    Returns:
+    tuple: (latencies in seconds, total wall time in seconds)
+    """
+    rng = np.random.default_rng(seed)
+    payloads = [{
+        "start"                     : rng.normal(size=(joints, 6)).tolist(),
+        "middle"                    : rng.normal(size=(joints, 6)).tolist(),
+        "end"                       : rng.normal(size=(joints, 6)).tolist(),
+        "num_intermediate_frames"   : num_intermediate_frames,
+    } for _ in range(min(requests, 64))]
+
+    def send(i):
+        started = time.perf_counter()
+        post_json(url + "/interpolate", payloads[i % len(payloads)])
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(send, range(requests)))
+    return np.array(latencies), time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the interpolation service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--joints", type=int, default=65)
+    parser.add_argument("--frames", type=int, default=8, help="In-betweens per request")
+    args = parser.parse_args()
+
+    latencies, wall = run_load(args.url, args.requests, args.concurrency, args.joints, args.frames)
+    p50, p95, p99 = np.percentile(latencies * 1000, [50, 95, 99])
+
+    print(f"Requests: {args.requests} x {args.joints} joints x {args.frames} frames, concurrency {args.concurrency}")
+    print(f"Throughput: {args.requests / wall:.1f} req/s ({args.requests * args.frames / wall:.1f} frames/s)")
+    print(f"Latency: p50 {p50:.2f} ms, p95 {p95:.2f} ms, p99 {p99:.2f} ms")
+
+    with urllib.request.urlopen(args.url + "/stats") as response:
+        print(json.dumps(json.loads(response.read()), indent=2))
@@ -0,0 +1,280 @@
+"""
+Long-lived keyframe interpolation service.
+
+Loads the interpolation model once and serves requests over local HTTP, so
+pipeline tools no longer pay interpreter start, model setup and data loading
+on every call. Concurrent requests are coalesced into micro-batches: the first
+queued request opens a batch which is flushed once it holds `max_batch_rows`
+network rows or `max_wait` seconds have passed, whichever comes first.
+
+Endpoints:
+- POST /interpolate : {"start": [[...]], "middle": [[...]], "end": [[...]], "num_intermediate_frames": 8}
+                      -> {"frames": [[[...]]]}  (num_intermediate_frames x joints x channels)
+- GET  /stats       : queue latency and batch size histograms
+
+Usage:
+python interpolation_service.py --model keyframe_interpolator.npz --port 8765
+"""
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from keyframe_interpolator import blend_inputs
+from keyframe_runtime import KeyframeRuntime
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+MAX_INTERMEDIATE_FRAMES = 1000
+
+
+class Histogram:
+    def __init__(self, bounds):
+        """
+        Initializes the Histogram object.
+
+        Parameters:
+        - bounds (list): Upper bucket bounds in increasing order. Values above the last bound
+          land in an overflow bucket.
+        """
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total  = 0
+        self.sum    = 0.0
+        self.lock   = threading.Lock()
+
+    def record(self, value):
+        index = int(np.searchsorted(self.bounds, value, side="left"))
+        with self.lock:
+            self.counts[index] += 1
+            self.total += 1
+            self.sum += value
+
+    def to_dict(self):
+        with self.lock:
+            labels = [f"<={bound:g}" for bound in self.bounds] + [f">{self.bounds[-1]:g}"]
+            return {
+                "count"   : self.total,
+                "mean"    : self.sum / self.total if self.total else 0.0,
+                "buckets" : dict(zip(labels, self.counts)),
+            }
+
+
+class _Job:
+    def __init__(self, inputs, shape):
+        self.inputs     = inputs
+        self.shape      = shape
+        self.enqueued   = time.perf_counter()
+        self.done       = threading.Event()
+        self.result     = None
+        self.error      = None
+
+
+class MicroBatcher:
+    def __init__(self, runtime, max_batch_rows=8192, max_wait=0.005):
+        """
+        Initializes the MicroBatcher object and starts its worker thread.
+
+        Parameters:
+        - runtime (KeyframeRuntime): Model used to evaluate every batch.
+        - max_batch_rows (int): Flush a batch once it holds this many network rows. Default is 8192.
+        - max_wait (float): Longest time in seconds a request waits for others to join its batch. Default is 5 ms.
+        """
+        self.runtime        = runtime
+        self.max_batch_rows = max_batch_rows
+        self.max_wait       = max_wait
+        self.queue          = queue.Queue()
+
+        self.queue_latency_ms   = Histogram([0.1, 0.5, 1, 2, 5, 10, 20, 50, 100, 500])
+        self.batch_requests     = Histogram([1, 2, 4, 8, 16, 32, 64, 128])
+        self.batch_rows         = Histogram([64, 256, 1024, 4096, 16384])
+
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def interpolate(self, start_frame, middle_frame, end_frame, num_intermediate_frames):
+        """
+        Queue one interpolation request and block until its batch has been evaluated.
+
+        Returns:
+        numpy.ndarray: float32 array of shape (num_intermediate_frames, joints, channels).
+        """
+        inputs = blend_inputs(start_frame, middle_frame, end_frame, num_intermediate_frames)
+        job = _Job(inputs.reshape(-1, inputs.shape[-1]),
+                   (num_intermediate_frames, start_frame.shape[0], self.runtime.output_dim))
+        self.queue.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def stop(self):
+        """Stop the worker thread once the queued requests have been served."""
+        self.queue.put(None)
+        self.worker.join()
+
+    def _collect(self, first):
+        """Gather queued jobs into a batch until the row limit or the first job's deadline is reached."""
+        batch = [first]
+        rows = len(first.inputs)
+        deadline = first.enqueued + self.max_wait
+        stopping = False
+
+        while rows < self.max_batch_rows:
+            # Jobs already waiting in the queue always join; only new arrivals are bounded by the deadline
+            timeout = deadline - time.perf_counter()
+            try:
+                job = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                stopping = True
+                break
+            batch.append(job)
+            rows += len(job.inputs)
+
+        return batch, rows, stopping
+
+    def _run(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+
+            batch, rows, stopping = self._collect(first)
+            started = time.perf_counter()
+            for job in batch:
+                self.queue_latency_ms.record((started - job.enqueued) * 1000)
+            self.batch_requests.record(len(batch))
+            self.batch_rows.record(rows)
+
+            try:
+                output = self.runtime.predict(np.concatenate([job.inputs for job in batch]))
+                offset = 0
+                for job in batch:
+                    job.result = output[offset:offset + len(job.inputs)].reshape(job.shape)
+                    offset += len(job.inputs)
+            except Exception as e:
+                logging.error(f"Batch of {len(batch)} requests failed: {e}")
+                for job in batch:
+                    job.error = e
+            finally:
+                for job in batch:
+                    job.done.set()
+
+            if stopping:
+                return
+
+    def stats(self):
+        return {
+            "queue_latency_ms"  : self.queue_latency_ms.to_dict(),
+            "batch_requests"    : self.batch_requests.to_dict(),
+            "batch_rows"        : self.batch_rows.to_dict(),
+        }
+
+
+def parse_request(payload, channels):
+    """
+    Validate an /interpolate payload.
+
+    Returns:
+    tuple: (start_frame, middle_frame, end_frame, num_intermediate_frames)
+
+    Raises:
+    ValueError: If the payload is malformed.
+    """
+    try:
+        poses = [np.asarray(payload[key], dtype=np.float64) for key in ("start", "middle", "end")]
+        num_intermediate_frames = int(payload.get("num_intermediate_frames", 8))
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid request: {e}")
+
+    shape = poses[0].shape
+    if len(shape) != 2 or shape[1] != channels or any(p.shape != shape for p in poses):
+        raise ValueError(f"start, middle and end must all be (joints, {channels}) arrays")
+    if not all(np.isfinite(p).all() for p in poses):
+        raise ValueError("Poses contain NaN or infinite values")
+    if not 1 <= num_intermediate_frames <= MAX_INTERMEDIATE_FRAMES:
+        raise ValueError(f"num_intermediate_frames must be between 1 and {MAX_INTERMEDIATE_FRAMES}")
+
+    return poses[0], poses[1], poses[2], num_intermediate_frames
+
+
+class InterpolationHandler(BaseHTTPRequestHandler):
+    batcher = None
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.batcher.stats())
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/interpolate":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+            request = parse_request(payload, self.batcher.runtime.output_dim)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        try:
+            frames = self.batcher.interpolate(*request)
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, {"frames": frames.tolist()})
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+
+class InterpolationServer(ThreadingHTTPServer):
+    daemon_threads      = True
+    request_queue_size  = 128   # the default of 5 makes bursts of clients retry their connects
+
+
+def serve(runtime, host="127.0.0.1", port=8765, max_batch_rows=8192, max_wait=0.005):
+    """Run the interpolation service until interrupted."""
+    batcher = MicroBatcher(runtime, max_batch_rows, max_wait)
+    handler = type("BoundInterpolationHandler", (InterpolationHandler,), {"batcher": batcher})
+    server = InterpolationServer((host, port), handler)
+
+    logging.info(f"Interpolation service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Stopping interpolation service.")
+    finally:
+        server.server_close()
+        batcher.stop()
+        logging.info(f"Final stats: {json.dumps(batcher.stats())}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve keyframe interpolation requests over local HTTP.")
+    parser.add_argument("--model", default="keyframe_interpolator.npz", help="Weights exported by export_model()")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch-rows", type=int, default=8192)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    serve(KeyframeRuntime.load(args.model), args.host, args.port, args.max_batch_rows, args.max_wait_ms / 1000)
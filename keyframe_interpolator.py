@@ -0,0 +1,327 @@
+"""
+Keyframe interpolation helpers used by export_keyframes_to_csv.
+
+Loads start/middle/end key poses from a keyframe CSV, trains (or reloads from
+the ModelStore) the Dense interpolation network and writes the predicted
+in-between frames back to CSV. Inference runs on the NumPy KeyframeRuntime;
+TensorFlow is only imported when a model actually has to be trained. When no
+model is available the analytic spline/squad interpolator is used instead.
+"""
+import csv
+import time
+import logging
+import importlib.util
+
+import numpy as np
+
+from keyframe_model_store import ModelStore
+from keyframe_runtime import KeyframeRuntime, max_prediction_error
+from analytic_interpolation import interpolate_in_betweens, interpolate_keys
+
+FIELDNAMES = ['Joint Name', 'Frame', 'Translate X', 'Translate Y', 'Translate Z', 'Rotate X', 'Rotate Y', 'Rotate Z']
+
+DEFAULT_HYPERPARAMS = {
+    "key_frames"    : [1, 5, 10],
+    "hidden_units"  : [128, 512, 128],
+    "epochs"        : 500,
+    "warm_epochs"   : 100,
+    "optimizer"     : "adam",
+    "loss"          : "mse",
+}
+
+# Largest acceptable difference between Keras and NumPy runtime predictions
+RUNTIME_TOLERANCE = 1e-3
+
+
+# Prepare data
+def prepare_frame_data(data, frame_number):
+    frame_data = data[data['Frame'] == frame_number].drop(columns=['Frame'])
+    joint_names = frame_data['Joint Name'].values
+    numeric_data = frame_data.drop(columns=['Joint Name']).values
+    return joint_names, numeric_data
+
+
+def load_key_poses(data, key_frames):
+    """
+    Extract and validate the start, middle and end key poses.
+
+    Parameters:
+    data (pandas.DataFrame): Keyframe table with 'Joint Name' and 'Frame' columns.
+    key_frames (list): Start, middle and end frame numbers.
+
+    Returns:
+    tuple: (joint_names, start_frame, middle_frame, end_frame) with float pose arrays.
+    """
+    start_num, middle_num, end_num = key_frames
+    joint_names_start, start_frame = prepare_frame_data(data, start_num)
+    joint_names_middle, middle_frame = prepare_frame_data(data, middle_num)
+    joint_names_end, end_frame = prepare_frame_data(data, end_num)
+
+    # Ensure all the joint names are in the same order
+    assert (joint_names_start == joint_names_middle).all() and (joint_names_middle == joint_names_end).all()
+
+    # Convert data to float type and check for NaN or infinite values
+    start_frame = start_frame.astype(float)
+    middle_frame = middle_frame.astype(float)
+    end_frame = end_frame.astype(float)
+
+    check_finite(start_frame, "start_frame")
+    check_finite(middle_frame, "middle_frame")
+    check_finite(end_frame, "end_frame")
+
+    return joint_names_start, start_frame, middle_frame, end_frame
+
+
+def check_finite(frame, name):
+    """Assert that a pose array holds no NaN or infinite values."""
+    assert not np.isnan(frame).any(), f"NaN values found in {name}"
+    assert not np.isinf(frame).any(), f"Infinite values found in {name}"
+
+
+def normalization_stats(input_data):
+    """Return per-feature mean and standard deviation, with constant features scaled by 1."""
+    mean = input_data.mean(axis=0)
+    std = input_data.std(axis=0)
+    std[std < 1e-8] = 1.0
+    return mean, std
+
+
+def tensorflow_available():
+    """Return True if TensorFlow can be imported, without importing it."""
+    return importlib.util.find_spec("tensorflow") is not None
+
+
+def build_model(input_dim, output_dim, hidden_units):
+    """Create the Dense interpolation network. Imports TensorFlow on first use."""
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense
+
+    layers = [Dense(hidden_units[0], activation='relu', input_shape=(input_dim,))]
+    layers += [Dense(units, activation='relu') for units in hidden_units[1:]]
+    layers.append(Dense(output_dim))
+    return Sequential(layers)
+
+
+def load_or_train_model(input_data, target, hyperparams=None, store=None, train=True):
+    """
+    Return a KeyframeRuntime for the data, reusing the ModelStore whenever possible.
+
+    The model is reloaded as-is when the data/hyperparameter fingerprint is cached.
+    Otherwise it is warm-started from the nearest compatible cached model and trained
+    for `warm_epochs`, or trained from scratch for `epochs` when nothing is cached.
+
+    Parameters:
+    input_data (numpy.ndarray): Concatenated start/middle/end poses, one row per joint.
+    target (numpy.ndarray): Training targets, one row per joint.
+    hyperparams (dict, optional): Defaults to DEFAULT_HYPERPARAMS.
+    store (ModelStore, optional): Defaults to a ModelStore in ./model_cache.
+    train (bool): Whether to train when the fingerprint is not cached. Default is True.
+
+    Returns:
+    tuple: (runtime, info) where info holds the fingerprint,
+    the mode ("cached", "warm", "cold" or "missing"), the seconds spent and the reference
+    cold training time, if known: the data's own for a cold model, the cold model it
+    started from for a warm one. runtime is None when the mode is
+    "missing", i.e. nothing was cached and training was disabled.
+    """
+    hyperparams = hyperparams or DEFAULT_HYPERPARAMS
+    store = store or ModelStore()
+    start_time = time.perf_counter()
+
+    fingerprint = store.fingerprint(input_data, target, hyperparams)
+
+    cached = store.load(fingerprint)
+    if cached is not None:
+        weights, input_mean, input_std, meta = cached
+        runtime = KeyframeRuntime(weights, input_mean, input_std)
+        info = {
+            "fingerprint"   : fingerprint,
+            "mode"          : "cached",
+            "seconds"       : time.perf_counter() - start_time,
+            "cold_seconds"  : store.cold_seconds(meta),
+        }
+        return runtime, info
+
+    if not train:
+        info = {
+            "fingerprint"   : fingerprint,
+            "mode"          : "missing",
+            "seconds"       : time.perf_counter() - start_time,
+            "cold_seconds"  : None,
+        }
+        return None, info
+
+    model = build_model(input_data.shape[1], target.shape[1], hyperparams["hidden_units"])
+    model.compile(optimizer=hyperparams["optimizer"], loss=hyperparams["loss"])
+
+    input_mean, input_std = normalization_stats(input_data)
+    nearest = store.find_nearest([w.shape for w in model.get_weights()], input_mean, input_std)
+    cold_seconds = None
+    if nearest is not None:
+        weights, _, _, nearest_meta = store.load(nearest)
+        model.set_weights(weights)
+        # The cold time of the model this run starts from is the reference a warm start is compared with
+        cold_seconds = store.cold_seconds(nearest_meta)
+        mode, epochs = "warm", hyperparams["warm_epochs"]
+        logging.info(f"Warm-starting from cached model {nearest[:12]}")
+    else:
+        mode, epochs = "cold", hyperparams["epochs"]
+
+    # Train model
+    model.fit((input_data - input_mean) / input_std, target, epochs=epochs)
+    seconds = time.perf_counter() - start_time
+    store.save(fingerprint, model.get_weights(), input_mean, input_std, hyperparams, seconds, mode, cold_seconds)
+
+    runtime = KeyframeRuntime(model.get_weights(), input_mean, input_std)
+    error = max_prediction_error(model, runtime, input_data)
+    if error > RUNTIME_TOLERANCE:
+        logging.warning(f"NumPy runtime differs from Keras by {error:.2e} (tolerance {RUNTIME_TOLERANCE:.0e})")
+
+    info = {
+        "fingerprint"   : fingerprint,
+        "mode"          : mode,
+        "seconds"       : seconds,
+        "cold_seconds"  : seconds if mode == "cold" else cold_seconds,
+    }
+    return runtime, info
+
+
+def blend_inputs(start_frame, middle_frame, end_frame, num_intermediate_frames):
+    """
+    Build the network inputs for every in-between frame at once.
+
+    Returns:
+    numpy.ndarray: Array of shape (num_intermediate_frames, joints, 3 * channels).
+    """
+    i = np.arange(1, num_intermediate_frames + 1)
+    alpha = (i / (num_intermediate_frames + 1))[:, None, None]
+    beta = ((num_intermediate_frames + 1 - i) / (num_intermediate_frames + 1))[:, None, None]
+    middle = np.broadcast_to(middle_frame, (num_intermediate_frames,) + middle_frame.shape)
+    return np.concatenate([alpha * start_frame + beta * middle_frame,
+                           middle,
+                           alpha * middle_frame + beta * end_frame], axis=2)
+
+
+def predict_intermediate_frames(runtime, start_frame, middle_frame, end_frame, num_intermediate_frames=8):
+    """
+    Predict the in-between poses with a single batched runtime call.
+
+    Returns:
+    numpy.ndarray: Array of shape (num_intermediate_frames, joints, channels).
+    """
+    inputs = blend_inputs(start_frame, middle_frame, end_frame, num_intermediate_frames)
+    predicted = runtime.predict(inputs.reshape(-1, inputs.shape[-1]))
+    return predicted.reshape(num_intermediate_frames, start_frame.shape[0], -1)
+
+
+def interpolate_intermediate_frames(runtime, start_frame, middle_frame, end_frame, key_frames):
+    """
+    Produce every frame strictly between the first and last key frame.
+
+    Uses the trained runtime when one is given, otherwise falls back to the
+    analytic spline/squad interpolator.
+
+    Returns:
+    numpy.ndarray: Array of shape (key_frames[-1] - key_frames[0] - 1, joints, channels).
+    """
+    if runtime is None:
+        return interpolate_in_betweens(start_frame, middle_frame, end_frame, key_frames)
+    num_intermediate_frames = key_frames[-1] - key_frames[0] - 1
+    return predict_intermediate_frames(runtime, start_frame, middle_frame, end_frame, num_intermediate_frames)
+
+
+def upsample_times(key_times, in_betweens):
+    """
+    Times of the frames produced by upsample_keys: every key time, with `in_betweens`
+    evenly spaced times inserted in each interval between consecutive keys.
+
+    Returns:
+    numpy.ndarray: Float array of shape ((keys - 1) * (in_betweens + 1) + 1,).
+    """
+    key_times = np.asarray(key_times, dtype=np.float64)
+    fractions = np.arange(in_betweens + 1) / (in_betweens + 1)
+    inner = key_times[:-1, None] + np.diff(key_times)[:, None] * fractions
+    return np.append(inner.ravel(), key_times[-1])
+
+
+def upsample_keys(runtime, keys, in_betweens, max_rows=1 << 18, key_times=None):
+    """
+    Insert `in_betweens` frames between every pair of consecutive keys of a clip.
+
+    With a runtime, keys are processed as start/middle/end windows, batched into
+    runtime calls of at most `max_rows` network rows; windows overlap by one key when
+    the key count is even. Without a runtime, or with fewer than three keys, the
+    analytic interpolator is used at the times given by upsample_times. The original
+    keys are kept unchanged in the output.
+
+    Parameters:
+    runtime (KeyframeRuntime): Trained interpolator, or None.
+    keys (numpy.ndarray): Key poses of shape (keys, joints, channels).
+    in_betweens (int): Frames to insert between consecutive keys.
+    max_rows (int): Bound on the rows blended per runtime call, which caps memory on long clips.
+    key_times (numpy.ndarray, optional): Frame numbers of the keys. Default is evenly spaced keys.
+        The trained interpolator only handles evenly spaced keys.
+
+    Returns:
+    numpy.ndarray: Array of shape ((keys - 1) * (in_betweens + 1) + 1, joints, channels).
+    """
+    step = in_betweens + 1
+    num_keys, num_joints, channels = keys.shape
+    key_times = np.arange(num_keys) if key_times is None else np.asarray(key_times)
+    output_times = upsample_times(key_times, in_betweens)
+
+    if runtime is None or num_keys < 3:
+        output = interpolate_keys(key_times, keys, output_times)
+        output[::step] = keys
+        return output
+    if len(np.unique(np.diff(key_times))) > 1:
+        raise ValueError("The trained interpolator needs evenly spaced keys")
+
+    starts = list(range(0, num_keys - 2, 2))
+    if starts[-1] + 2 < num_keys - 1:
+        starts.append(num_keys - 3)
+    starts = np.array(starts)
+
+    num_intermediate_frames = 2 * step - 1
+    chunk = max(1, max_rows // (num_intermediate_frames * num_joints))
+    output = np.empty((len(output_times), num_joints, channels))
+
+    for first in range(0, len(starts), chunk):
+        # Stack the windows along the joint axis so one runtime call covers the whole chunk
+        chunk_starts = starts[first:first + chunk]
+        predicted = predict_intermediate_frames(runtime,
+                                                keys[chunk_starts].reshape(-1, channels),
+                                                keys[chunk_starts + 1].reshape(-1, channels),
+                                                keys[chunk_starts + 2].reshape(-1, channels),
+                                                num_intermediate_frames)
+        predicted = predicted.reshape(num_intermediate_frames, len(chunk_starts), num_joints, channels)
+        for window, start in enumerate(chunk_starts):
+            base = start * step
+            output[base + 1:base + 2 * step] = predicted[:, window]
+
+    output[::step] = keys
+    return output
+
+
+# ===================================================================================================================================
+# Save interpolated frames to CSV
+# ===================================================================================================================================
+def save_interpolated_keyframes_to_csv(joint_names, interpolated_frames, start_frame_num, end_frame_num, file_path):
+    frames = range(start_frame_num + 1, end_frame_num)
+    with open(file_path, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+        writer.writeheader()
+
+        for frame_idx, frame in enumerate(frames):
+            for joint_idx, joint in enumerate(joint_names):
+                interpolated_pose = interpolated_frames[frame_idx][joint_idx]
+                writer.writerow({
+                    'Joint Name': joint,
+                    'Frame': frame,
+                    'Translate X': interpolated_pose[0],
+                    'Translate Y': interpolated_pose[1],
+                    'Translate Z': interpolated_pose[2],
+                    'Rotate X': interpolated_pose[3],
+                    'Rotate Y': interpolated_pose[4],
+                    'Rotate Z': interpolated_pose[5]
+                })
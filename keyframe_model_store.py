@@ -0,0 +1,168 @@
+"""
+On-disk cache of trained keyframe interpolation models.
+
+Each entry is keyed by a fingerprint of the training data (content hash of the
+input/target arrays) plus the training hyperparameters, and is stored as two files:
+
+- <fingerprint>.npz  : layer weights (layer_0, layer_1, ...) and the input
+                       normalization stats (input_mean, input_std)
+- <fingerprint>.json : metadata (hyperparameters, layer shapes, training time and mode)
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+
+import numpy as np
+
+
+class ModelStore:
+    def __init__(self, cache_dir="model_cache"):
+        """
+        Initializes the ModelStore object.
+
+        Parameters:
+        - cache_dir (str): Directory holding the cached models. Created on first save.
+        """
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def fingerprint(input_data, target, hyperparams):
+        """
+        Compute the cache key for a training set.
+
+        Parameters:
+        input_data (numpy.ndarray): Training inputs.
+        target (numpy.ndarray): Training targets.
+        hyperparams (dict): Training hyperparameters (must be JSON serializable).
+
+        Returns:
+        str: Hex digest identifying the data and hyperparameters.
+        """
+        digest = hashlib.sha256()
+        for array in (input_data, target):
+            array = np.ascontiguousarray(array, dtype=np.float64)
+            digest.update(str(array.shape).encode())
+            digest.update(array.tobytes())
+        digest.update(json.dumps(hyperparams, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _paths(self, fingerprint):
+        base = os.path.join(self.cache_dir, fingerprint)
+        return base + ".npz", base + ".json"
+
+    def _read_meta(self, meta_path):
+        try:
+            with open(meta_path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable model metadata {meta_path}: {e}")
+            return None
+
+    def load(self, fingerprint):
+        """
+        Load a cached model.
+
+        Returns:
+        tuple: (weights, input_mean, input_std, meta), or None if the fingerprint is not cached.
+        """
+        weights_path, meta_path = self._paths(fingerprint)
+        if not (os.path.exists(weights_path) and os.path.exists(meta_path)):
+            return None
+
+        meta = self._read_meta(meta_path)
+        if meta is None:
+            return None
+
+        with np.load(weights_path) as archive:
+            weights = [archive[f"layer_{i}"] for i in range(len(meta["layer_shapes"]))]
+            input_mean = archive["input_mean"]
+            input_std = archive["input_std"]
+        return weights, input_mean, input_std, meta
+
+    def save(self, fingerprint, weights, input_mean, input_std, hyperparams, train_seconds, train_mode=None,
+             cold_seconds=None):
+        """
+        Store trained weights and normalization stats under the given fingerprint.
+
+        Parameters:
+        fingerprint (str): Cache key returned by fingerprint().
+        weights (list): Layer weights as returned by model.get_weights().
+        input_mean (numpy.ndarray): Per-feature mean used to normalize inputs.
+        input_std (numpy.ndarray): Per-feature standard deviation used to normalize inputs.
+        hyperparams (dict): Training hyperparameters.
+        train_seconds (float): Wall time spent training, reported on later cache hits.
+        train_mode (str, optional): How the model was trained, "cold" or "warm".
+        cold_seconds (float, optional): For a warm-started model, the cold training time of the model it
+            started from, kept as the reference cold time for later cache hits.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        weights_path, meta_path = self._paths(fingerprint)
+
+        arrays = {f"layer_{i}": np.asarray(w) for i, w in enumerate(weights)}
+        arrays["input_mean"] = np.asarray(input_mean)
+        arrays["input_std"] = np.asarray(input_std)
+
+        # Write to temporary files first so a crash never leaves a half-written entry behind
+        tmp_weights = weights_path + ".tmp.npz"
+        np.savez(tmp_weights, **arrays)
+        os.replace(tmp_weights, weights_path)
+
+        meta = {
+            "fingerprint"   : fingerprint,
+            "hyperparams"   : hyperparams,
+            "layer_shapes"  : [list(np.shape(w)) for w in weights],
+            "train_seconds" : train_seconds,
+            "train_mode"    : train_mode,
+            "cold_seconds"  : train_seconds if train_mode == "cold" else cold_seconds,
+            "created"       : time.time(),
+        }
+        tmp_meta = meta_path + ".tmp"
+        with open(tmp_meta, "w") as file:
+            json.dump(meta, file, indent=2)
+        os.replace(tmp_meta, meta_path)
+
+        logging.info(f"Cached model {fingerprint[:12]} in {self.cache_dir}")
+
+    @staticmethod
+    def cold_seconds(meta):
+        """Reference cold training time of a cached model: its own if trained cold, else its starting model's."""
+        if meta.get("train_mode") == "cold":
+            return meta.get("train_seconds")
+        return meta.get("cold_seconds")
+
+    def find_nearest(self, layer_shapes, input_mean, input_std):
+        """
+        Find the cached model best suited to warm-start a new training run.
+
+        Only models with the same layer shapes are candidates; among those the one
+        whose input normalization stats are closest to the new data wins.
+
+        Returns:
+        str: Fingerprint of the nearest compatible model, or None if there is none.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return None
+
+        layer_shapes = [list(shape) for shape in layer_shapes]
+        best_fingerprint, best_distance = None, None
+
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            meta = self._read_meta(os.path.join(self.cache_dir, name))
+            if not meta or meta.get("layer_shapes") != layer_shapes:
+                continue
+
+            cached = self.load(meta["fingerprint"])
+            if cached is None:
+                continue
+            _, cached_mean, cached_std, _ = cached
+
+            distance = float(np.linalg.norm((cached_mean - input_mean) / input_std) +
+                             np.linalg.norm(np.log(cached_std / input_std)))
+            if best_distance is None or distance < best_distance:
+                best_fingerprint, best_distance = meta["fingerprint"], distance
+
+        return best_fingerprint
@@ -0,0 +1,115 @@
+"""
+NumPy-only inference runtime for the keyframe interpolation network.
+
+The trained Dense network is a plain ReLU MLP, so inference does not need
+TensorFlow: export_model() dumps the weights of a trained Sequential model to a
+small .npz file and KeyframeRuntime evaluates the forward pass in float32.
+
+The .npz layout (layer_0, layer_1, ..., input_mean, input_std) is the same one
+ModelStore uses, so cached models can be loaded directly.
+"""
+import numpy as np
+
+
+class KeyframeRuntime:
+    def __init__(self, weights, input_mean=None, input_std=None, batch_size=4096):
+        """
+        Initializes the KeyframeRuntime object.
+
+        Parameters:
+        - weights (list): Alternating kernel/bias arrays as returned by model.get_weights().
+        - input_mean (numpy.ndarray): Per-feature mean subtracted from inputs. Default is no shift.
+        - input_std (numpy.ndarray): Per-feature scale dividing inputs. Default is no scaling.
+        - batch_size (int): Maximum number of rows evaluated per matrix multiply. Default is 4096.
+        """
+        if len(weights) % 2:
+            raise ValueError("Expected alternating kernel and bias arrays.")
+
+        self.kernels    = [np.ascontiguousarray(w, dtype=np.float32) for w in weights[0::2]]
+        self.biases     = [np.ascontiguousarray(b, dtype=np.float32) for b in weights[1::2]]
+        self.input_dim  = self.kernels[0].shape[0]
+        self.output_dim = self.kernels[-1].shape[1]
+        self.batch_size = batch_size
+
+        self.input_mean = np.zeros(self.input_dim, np.float32) if input_mean is None else np.asarray(input_mean, np.float32)
+        self.input_std  = np.ones(self.input_dim, np.float32) if input_std is None else np.asarray(input_std, np.float32)
+
+    @classmethod
+    def load(cls, file_path, batch_size=4096):
+        """Load a runtime from an .npz written by export_model() or ModelStore."""
+        with np.load(file_path) as archive:
+            layer_count = sum(1 for name in archive.files if name.startswith("layer_"))
+            weights = [archive[f"layer_{i}"] for i in range(layer_count)]
+            input_mean = archive["input_mean"] if "input_mean" in archive.files else None
+            input_std = archive["input_std"] if "input_std" in archive.files else None
+        return cls(weights, input_mean, input_std, batch_size)
+
+    def get_weights(self):
+        """Return the weights in model.get_weights() order."""
+        weights = []
+        for kernel, bias in zip(self.kernels, self.biases):
+            weights.extend([kernel, bias])
+        return weights
+
+    def _forward(self, x):
+        x = (x - self.input_mean) / self.input_std
+        last = len(self.kernels) - 1
+        for i, (kernel, bias) in enumerate(zip(self.kernels, self.biases)):
+            x = x @ kernel
+            x += bias
+            if i < last:
+                np.maximum(x, 0, out=x)
+        return x
+
+    def predict(self, inputs):
+        """
+        Evaluate the network on raw (un-normalized) inputs.
+
+        Parameters:
+        inputs (numpy.ndarray): Array of shape (rows, input_dim).
+
+        Returns:
+        numpy.ndarray: float32 array of shape (rows, output_dim).
+        """
+        inputs = np.asarray(inputs, dtype=np.float32)
+        if inputs.ndim != 2 or inputs.shape[1] != self.input_dim:
+            raise ValueError(f"Expected inputs of shape (rows, {self.input_dim}), got {inputs.shape}")
+
+        if len(inputs) <= self.batch_size:
+            return self._forward(inputs)
+
+        output = np.empty((len(inputs), self.output_dim), dtype=np.float32)
+        for start in range(0, len(inputs), self.batch_size):
+            output[start:start + self.batch_size] = self._forward(inputs[start:start + self.batch_size])
+        return output
+
+
+def export_model(model, file_path, input_mean=None, input_std=None):
+    """
+    Dump the weights of a trained Sequential model to an .npz usable by KeyframeRuntime.
+
+    Parameters:
+    model (tensorflow.keras.Model): Trained Dense network (ReLU hidden layers, linear output),
+        or a KeyframeRuntime to re-export.
+    file_path (str): Destination .npz path.
+    input_mean (numpy.ndarray, optional): Input normalization mean used during training.
+    input_std (numpy.ndarray, optional): Input normalization scale used during training.
+    """
+    arrays = {f"layer_{i}": np.asarray(w, dtype=np.float32) for i, w in enumerate(model.get_weights())}
+    if input_mean is not None:
+        arrays["input_mean"] = np.asarray(input_mean, dtype=np.float32)
+    if input_std is not None:
+        arrays["input_std"] = np.asarray(input_std, dtype=np.float32)
+    np.savez(file_path, **arrays)
+
+
+def max_prediction_error(model, runtime, inputs):
+    """
+    Compare the Keras model and the NumPy runtime on the same raw inputs.
+
+    Returns:
+    float: Largest absolute difference between the two predictions.
+    """
+    normalized = (np.asarray(inputs, np.float32) - runtime.input_mean) / runtime.input_std
+    expected = model.predict(normalized, verbose=0)
+    return float(np.max(np.abs(expected - runtime.predict(inputs))))
@@ -0,0 +1,128 @@
+"""
+Loading of motion clips into dense pose arrays.
+
+Supports the per-joint-per-frame CSV exports (Walking_*.csv and the Maya
+keyframe CSVs, whose column spellings differ slightly) and the nested
+animation_data.json layout. Every clip is converted to a MotionClip holding a
+(frames, joints, 6) float array of translate XYZ / rotate XYZ channels.
+"""
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+CHANNELS = ["translate_x", "translate_y", "translate_z", "rotate_x", "rotate_y", "rotate_z"]
+
+# Column names written by save_clip, matching the Maya keyframe CSV export
+CSV_COLUMNS = ['Joint Name', 'Frame', 'Translate X', 'Translate Y', 'Translate Z', 'Rotate X', 'Rotate Y', 'Rotate Z']
+
+# Column names are matched case-insensitively with spaces and underscores removed
+_COLUMN_ALIASES = {
+    "jointname" : "joint",
+    "joint"     : "joint",
+    "frame"     : "frame",
+    "label"     : "label",
+}
+_COLUMN_ALIASES.update({channel.replace("_", ""): channel for channel in CHANNELS})
+
+
+class MotionClip:
+    def __init__(self, name, joint_names, frames, poses, labels=None):
+        """
+        Initializes the MotionClip object.
+
+        Parameters:
+        - name (str): Clip name, usually the file name without extension.
+        - joint_names (list): Joint names in the order of the pose array's joint axis.
+        - frames (numpy.ndarray): Frame numbers, one per pose.
+        - poses (numpy.ndarray): Float array of shape (frames, joints, 6).
+        - labels (numpy.ndarray): Optional per-frame labels. Default is None.
+        """
+        self.name           = name
+        self.joint_names    = list(joint_names)
+        self.frames         = np.asarray(frames)
+        self.poses          = np.asarray(poses, dtype=np.float64)
+        self.labels         = None if labels is None else np.asarray(labels, dtype=object)
+
+    @property
+    def num_frames(self):
+        return self.poses.shape[0]
+
+    @property
+    def num_joints(self):
+        return self.poses.shape[1]
+
+    def __repr__(self):
+        return f"MotionClip({self.name!r}, frames={self.num_frames}, joints={self.num_joints})"
+
+    @classmethod
+    def from_dataframe(cls, name, data):
+        """
+        Build a clip from a long table with one row per joint per frame.
+
+        Raises:
+        ValueError: If required columns are missing or a frame lacks some joints.
+        """
+        data = data.rename(columns=lambda c: _COLUMN_ALIASES.get(c.lower().replace(" ", "").replace("_", ""), c))
+        missing = [c for c in ["joint", "frame"] + CHANNELS if c not in data.columns]
+        if missing:
+            raise ValueError(f"{name}: missing columns {missing}")
+
+        joint_names = list(pd.unique(data["joint"]))
+        frames = np.sort(pd.unique(data["frame"]))
+        if len(data) != len(joint_names) * len(frames):
+            raise ValueError(f"{name}: expected {len(joint_names)} joints for each of {len(frames)} frames")
+
+        index = pd.MultiIndex.from_product([frames, joint_names], names=["frame", "joint"])
+        table = data.set_index(["frame", "joint"]).reindex(index)
+        poses = table[CHANNELS].to_numpy(dtype=np.float64).reshape(len(frames), len(joint_names), len(CHANNELS))
+        if np.isnan(poses).any():
+            raise ValueError(f"{name}: missing or NaN channel values")
+
+        labels = None
+        if "label" in table.columns:
+            labels = table["label"].to_numpy().reshape(len(frames), len(joint_names))[:, 0]
+        return cls(name, joint_names, frames, poses, labels)
+
+
+def _json_to_dataframe(records):
+    rows = []
+    for joint in records:
+        for key in joint["keyframes"]:
+            row = {"joint": joint["joint_name"]}
+            row.update(key)
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def load_clip(file_path):
+    """
+    Load a CSV or JSON motion clip.
+
+    Returns:
+    MotionClip: The clip, named after the file.
+    """
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    if file_path.lower().endswith(".json"):
+        with open(file_path, "r") as file:
+            data = _json_to_dataframe(json.load(file))
+    else:
+        data = pd.read_csv(file_path)
+    return MotionClip.from_dataframe(name, data)
+
+
+def clip_to_dataframe(clip):
+    """Convert a clip to the keyframe CSV layout, one row per joint per frame (plus Label if labelled)."""
+    num_frames, num_joints = clip.num_frames, clip.num_joints
+    data = pd.DataFrame(clip.poses.reshape(-1, len(CHANNELS)), columns=CSV_COLUMNS[2:])
+    data.insert(0, CSV_COLUMNS[0], np.tile(np.asarray(clip.joint_names, dtype=object), num_frames))
+    data.insert(1, CSV_COLUMNS[1], np.repeat(clip.frames, num_joints))
+    if clip.labels is not None:
+        data["Label"] = np.repeat(clip.labels, num_joints)
+    return data
+
+
+def save_clip(clip, file_path):
+    """Write a clip as a keyframe CSV."""
+    clip_to_dataframe(clip).to_csv(file_path, index=False)
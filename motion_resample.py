@@ -0,0 +1,239 @@
+"""
+Retiming, resampling and key reduction of whole motion clips.
+
+Every operation works on the dense (frames, joints, 6) pose array of a
+MotionClip at once:
+
+- resample_clip()  : convert a clip to another frame rate
+- time_warp_clip() : evaluate a clip at arbitrary (warped) source times
+- simplify_clip()  : drop keys that the remaining keys reproduce within a tolerance
+
+The cubic method uses the analytic spline/squad interpolator; the linear method
+is a plain per-channel lerp, cheaper on long captures.
+
+Usage:
+python motion_resample.py Walking_A.csv --source-fps 30 --target-fps 24 --simplify --out Walking_A_24fps.csv
+"""
+import time
+import logging
+import argparse
+
+import numpy as np
+
+from analytic_interpolation import interpolate_keys
+from motion_clips import MotionClip, load_clip, save_clip
+
+
+def _interpolate_linear(key_times, key_poses, query_times):
+    segment = np.clip(np.searchsorted(key_times, query_times, side="right") - 1, 0, len(key_times) - 2)
+    t0, t1 = key_times[segment], key_times[segment + 1]
+    t = np.clip((query_times - t0) / (t1 - t0), 0.0, 1.0)[:, None, None]
+    return (1 - t) * key_poses[segment] + t * key_poses[segment + 1]
+
+
+def sample_poses(key_times, key_poses, query_times, method="cubic"):
+    """
+    Evaluate key poses at arbitrary times.
+
+    Parameters:
+    key_times (numpy.ndarray): Strictly increasing times of shape (keys,).
+    key_poses (numpy.ndarray): Array of shape (keys, joints, 6).
+    query_times (numpy.ndarray): Times of shape (queries,), clamped to the key range.
+    method (str): "cubic" (spline/squad) or "linear". Default is "cubic".
+
+    Returns:
+    numpy.ndarray: Array of shape (queries, joints, 6).
+    """
+    key_times = np.asarray(key_times, dtype=np.float64)
+    query_times = np.asarray(query_times, dtype=np.float64)
+    if method == "cubic":
+        return interpolate_keys(key_times, key_poses, query_times)
+    if method != "linear":
+        raise ValueError(f"Unknown interpolation method: {method}")
+    if len(key_times) == 1:
+        return np.repeat(key_poses, len(query_times), axis=0)
+    return _interpolate_linear(key_times, key_poses, query_times)
+
+
+def nearest_frames(frames, times):
+    """Index of the frame closest to each time (ties go to the earlier frame)."""
+    if len(frames) == 1:
+        return np.zeros(len(times), dtype=np.int64)
+    after = np.clip(np.searchsorted(frames, times), 1, len(frames) - 1)
+    before = after - 1
+    return np.where(times - frames[before] <= frames[after] - times, before, after)
+
+
+def time_warp_clip(clip, source_times, method="cubic"):
+    """
+    Build a new clip whose frame i shows the source clip at `source_times[i]`.
+
+    Parameters:
+    clip (MotionClip): Source clip; its frame numbers are its time axis.
+    source_times (numpy.ndarray): Source times (in source frames) for each output frame,
+        e.g. a slow-motion or ease-in time-warp curve.
+    method (str): "cubic" or "linear". Default is "cubic".
+
+    Returns:
+    MotionClip: Clip with frames numbered 0..len(source_times) - 1.
+    """
+    source_times = np.asarray(source_times, dtype=np.float64)
+    poses = sample_poses(clip.frames, clip.poses, source_times, method)
+
+    labels = None
+    if clip.labels is not None:
+        labels = clip.labels[nearest_frames(clip.frames, source_times)]
+    return MotionClip(clip.name, clip.joint_names, np.arange(len(source_times)), poses, labels)
+
+
+def resample_clip(clip, source_fps, target_fps, method="cubic"):
+    """
+    Convert a clip from `source_fps` to `target_fps`, keeping its duration.
+
+    Gaps in the frame numbers (e.g. the output of simplify_clip) are filled by
+    interpolation, so the result always has one frame per target-rate tick.
+
+    Returns:
+    MotionClip: Resampled clip with frames numbered from 0 at the target rate.
+    """
+    if source_fps == target_fps and np.all(np.diff(clip.frames) == 1):
+        return MotionClip(clip.name, clip.joint_names, np.arange(clip.num_frames), clip.poses.copy(),
+                          None if clip.labels is None else clip.labels.copy())
+
+    duration = (clip.frames[-1] - clip.frames[0]) / source_fps
+    count = int(np.floor(duration * target_fps + 1e-9)) + 1
+    source_times = clip.frames[0] + np.arange(count) * (source_fps / target_fps)
+    return time_warp_clip(clip, source_times, method)
+
+
+def pose_error(predicted, expected, translate_tolerance, rotate_tolerance):
+    """
+    Per-frame reconstruction error relative to the tolerances (<= 1 means within tolerance).
+
+    Returns:
+    numpy.ndarray: Array of shape (frames,), the worst channel of the worst joint.
+    """
+    difference = np.abs(predicted - expected)
+    rotation = difference[..., 3:]
+    rotation = np.minimum(rotation % 360.0, 360.0 - rotation % 360.0)
+    translate = difference[..., :3].max(axis=(1, 2)) / translate_tolerance
+    rotate = rotation.max(axis=(1, 2)) / rotate_tolerance
+    return np.maximum(translate, rotate)
+
+
+def simplify_keys(times, poses, translate_tolerance=0.25, rotate_tolerance=3.0, method="cubic", max_refinements=20):
+    """
+    Select the keys needed to reproduce a dense clip within the given tolerances.
+
+    Runs Ramer-Douglas-Peucker on whole poses against linear reconstruction, then,
+    for cubic playback, adds back the worst frames until the spline reconstruction
+    is also within tolerance.
+
+    Parameters:
+    times (numpy.ndarray): Frame times of shape (frames,).
+    poses (numpy.ndarray): Array of shape (frames, joints, 6).
+    translate_tolerance (float): Largest allowed translation error, in scene units. Default is 0.25.
+    rotate_tolerance (float): Largest allowed rotation error in degrees. Default is 3.0.
+    method (str): Playback interpolation, "cubic" or "linear". Default is "cubic".
+    max_refinements (int): Upper bound on cubic refinement passes. Default is 20.
+
+    Returns:
+    numpy.ndarray: Sorted indices of the kept frames (always including the first and last).
+    """
+    times = np.asarray(times, dtype=np.float64)
+    count = len(times)
+    if count <= 2:
+        return np.arange(count)
+
+    keep = np.zeros(count, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        inner = np.arange(first + 1, last)
+        predicted = _interpolate_linear(times[[first, last]], poses[[first, last]], times[inner])
+        error = pose_error(predicted, poses[inner], translate_tolerance, rotate_tolerance)
+        worst = int(np.argmax(error))
+        if error[worst] > 1.0:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    if method == "cubic":
+        for refinement in range(max_refinements + 1):
+            kept = np.flatnonzero(keep)
+            predicted = interpolate_keys(times[kept], poses[kept], times)
+            error = pose_error(predicted, poses, translate_tolerance, rotate_tolerance)
+            over = error > 1.0
+            if not over.any():
+                break
+            if refinement == max_refinements:
+                # Out of refinement passes: keep every frame still over tolerance rather than return a bad key set
+                logging.warning(f"simplify_keys: {int(over.sum())} frames still over tolerance after "
+                                f"{max_refinements} refinements (worst {error.max():.1f}x); keeping them as keys")
+                keep[over] = True
+                kept = np.flatnonzero(keep)
+                error = pose_error(interpolate_keys(times[kept], poses[kept], times), poses,
+                                   translate_tolerance, rotate_tolerance)
+                if (error > 1.0).any():
+                    keep[:] = True
+                break
+            # Add the worst frame of every offending segment between kept keys
+            segment = np.searchsorted(kept, np.arange(count), side="right")
+            order = np.lexsort((error, segment))
+            last_of_segment = np.append(segment[order][1:] != segment[order][:-1], True)
+            worst = order[last_of_segment]
+            keep[worst[over[worst]]] = True
+
+    return np.flatnonzero(keep)
+
+
+def simplify_clip(clip, translate_tolerance=0.25, rotate_tolerance=3.0, method="cubic"):
+    """
+    Drop redundant keys from a clip.
+
+    The tolerances bound the error of the worst channel of the worst joint. The defaults
+    keep about 60-85% of the keys of the bundled walking captures; tolerances much below
+    them keep nearly every frame of mocap data and make the simplification lossless only.
+
+    Returns:
+    MotionClip: Clip holding only the kept frames, with their original frame numbers.
+    """
+    kept = simplify_keys(clip.frames, clip.poses, translate_tolerance, rotate_tolerance, method)
+    labels = None if clip.labels is None else clip.labels[kept]
+    return MotionClip(clip.name, clip.joint_names, clip.frames[kept], clip.poses[kept], labels)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resample a motion clip and optionally drop redundant keys.")
+    parser.add_argument("clip", help="CSV or JSON motion clip")
+    parser.add_argument("--source-fps", type=float, default=30.0)
+    parser.add_argument("--target-fps", type=float, help="Resample to this frame rate")
+    parser.add_argument("--method", choices=["cubic", "linear"], default="cubic")
+    parser.add_argument("--simplify", action="store_true", help="Drop keys reproducible within tolerance")
+    parser.add_argument("--translate-tolerance", type=float, default=0.25, help="Scene units")
+    parser.add_argument("--rotate-tolerance", type=float, default=3.0, help="Degrees")
+    parser.add_argument("--out", help="Write the result to this CSV")
+    args = parser.parse_args()
+
+    clip = load_clip(args.clip)
+    print(f"Loaded {clip}")
+
+    if args.target_fps:
+        started = time.perf_counter()
+        clip = resample_clip(clip, args.source_fps, args.target_fps, args.method)
+        print(f"Resampled to {args.target_fps:g} fps: {clip.num_frames} frames in {time.perf_counter() - started:.4f}s")
+
+    if args.simplify:
+        started = time.perf_counter()
+        simplified = simplify_clip(clip, args.translate_tolerance, args.rotate_tolerance, args.method)
+        print(f"Simplified: kept {simplified.num_frames}/{clip.num_frames} keys "
+              f"({100 * simplified.num_frames / clip.num_frames:.1f}%) in {time.perf_counter() - started:.4f}s")
+        clip = simplified
+
+    if args.out:
+        save_clip(clip, args.out)
+        print(f"Saved {args.out}")
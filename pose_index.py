@@ -0,0 +1,316 @@
+"""
+Nearest-neighbour index over per-frame poses for motion matching across clips.
+
+Each frame becomes a feature vector of its joint channels plus their per-frame
+velocities. Rotations enter as the sin/cos of each angle and their velocities
+are taken on unwrapped angles, so a wrap from 179 to -179 degrees is a small
+step rather than a 358 degree jump. Features are z-scored, so channels with
+large ranges (root translation) do not drown out the rest. Low-dimensional
+indexes are served by a scipy cKDTree when scipy is installed; otherwise, and
+for high-dimensional features where trees degrade to brute force anyway, queries
+use a blocked matrix-multiply scan in float32.
+
+Insertion is incremental. Frames are appended to growable buffers, and only the
+new rows are normalized on the next query. The z-score stats are kept as running
+sums and applied (renormalizing every row) only once the index has doubled since
+they were last applied; the KD-tree is rebuilt on the same doubling schedule and
+frames added since are scanned by brute force. Inserting N frames in any number
+of clips therefore costs O(N) amortized, however queries are interleaved.
+
+The bundled clips only hold local joint channels (no skeleton hierarchy), so the
+"positions" are the joints' local translate/rotate channels. The root joint's
+horizontal translation is left out so matches do not depend on where in the
+scene a clip was captured; its velocity is kept.
+
+Usage:
+python pose_index.py Walking_A.csv Walking_C.csv Walking_D.csv animation_data.json --save pose_index.npz
+"""
+import time
+import logging
+import argparse
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+from motion_clips import CHANNELS, load_clip
+
+
+def _grown(array, capacity):
+    """Copy of `array` with room for `capacity` rows."""
+    grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class PoseIndex:
+    def __init__(self, joint_names, joints=None, root_joint="Hips", velocity_weight=1.0,
+                 kd_tree_max_dims=16, block_size=8192):
+        """
+        Initializes the PoseIndex object.
+
+        Parameters:
+        - joint_names (list): Joint order of the clips that will be indexed.
+        - joints (list): Joints used for matching. Default is None, which uses every joint.
+        - root_joint (str): Joint whose translate X/Z positions are ignored. Default is "Hips".
+        - velocity_weight (float): Scale of the velocity features relative to poses. Default is 1.0.
+        - kd_tree_max_dims (int): Use a KD-tree only up to this many feature dimensions. Default is 16.
+        - block_size (int): Indexed frames scanned per block by the brute-force search. Default is 8192.
+        """
+        self.joint_names        = list(joint_names)
+        self.joints             = list(joints) if joints else list(joint_names)
+        self.root_joint         = root_joint
+        self.velocity_weight    = velocity_weight
+        self.kd_tree_max_dims   = kd_tree_max_dims
+        self.block_size         = block_size
+
+        self.joint_index = np.array([self.joint_names.index(joint) for joint in self.joints])
+        mask = np.ones((len(self.joints), len(CHANNELS)), dtype=bool)
+        if root_joint in self.joints:
+            root = self.joints.index(root_joint)
+            mask[root, CHANNELS.index("translate_x")] = False
+            mask[root, CHANNELS.index("translate_z")] = False
+        self.pose_mask = mask.ravel()
+        rotation = np.array([channel.startswith("rotate") for channel in CHANNELS])
+        self.rotation_mask = np.tile(rotation, len(self.joints))
+
+        self.clip_names     = []
+        self._size          = 0
+        self._raw           = np.empty((0, self.dimensions), dtype=np.float32)
+        self._clip_ids      = np.empty(0, dtype=np.int32)
+        self._frames        = np.empty(0, dtype=np.int64)
+        self._sum           = np.zeros(self.dimensions)
+        self._sum_squares   = np.zeros(self.dimensions)
+
+        # Normalized copies of the first _normalized rows, with the stats of the first _stats_size rows
+        self.mean           = None
+        self.std            = None
+        self.tree           = None
+        self._normalized    = 0
+        self._stats_size    = 0
+        self._tree_size     = 0
+        self._features      = np.empty((0, self.dimensions), dtype=np.float32)
+        self._squared_norms = np.empty(0, dtype=np.float32)
+
+    @property
+    def dimensions(self):
+        translations = int((self.pose_mask & ~self.rotation_mask).sum())
+        return translations + 2 * int(self.rotation_mask.sum()) + self.pose_mask.size
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def raw_features(self):
+        return self._raw[:self._size]
+
+    @property
+    def clip_ids(self):
+        return self._clip_ids[:self._size]
+
+    @property
+    def frames(self):
+        return self._frames[:self._size]
+
+    @property
+    def features(self):
+        return self._features[:self._normalized]
+
+    @property
+    def squared_norms(self):
+        return self._squared_norms[:self._normalized]
+
+    def pose_features(self, clip):
+        """
+        Compute the un-normalized feature vectors of every frame of a clip.
+
+        Returns:
+        numpy.ndarray: float32 array of shape (frames, dimensions).
+        """
+        if clip.joint_names != self.joint_names:
+            raise ValueError(f"{clip.name}: joint order does not match the index")
+
+        poses = clip.poses[:, self.joint_index].reshape(clip.num_frames, -1)
+        if clip.num_frames > 1:
+            continuous = poses.copy()
+            continuous[:, self.rotation_mask] = np.unwrap(poses[:, self.rotation_mask], period=360.0, axis=0)
+            velocities = np.gradient(continuous, axis=0)
+        else:
+            velocities = np.zeros_like(poses)
+
+        angles = np.radians(poses[:, self.rotation_mask])
+        return np.concatenate([poses[:, self.pose_mask & ~self.rotation_mask], np.sin(angles), np.cos(angles),
+                               velocities * self.velocity_weight], axis=1).astype(np.float32)
+
+    def add_clip(self, clip):
+        """Insert every frame of a clip. Only the new rows are normalized, on the next query."""
+        features = self.pose_features(clip)
+        self._append(features, np.full(len(features), len(self.clip_names), np.int32), clip.frames)
+        self.clip_names.append(clip.name)
+
+    def _append(self, features, clip_ids, frames):
+        end = self._size + len(features)
+        if end > len(self._raw):
+            # Grow geometrically so appending stays amortized O(rows)
+            capacity = max(end, 2 * len(self._raw), 1024)
+            self._raw = _grown(self._raw, capacity)
+            self._clip_ids = _grown(self._clip_ids, capacity)
+            self._frames = _grown(self._frames, capacity)
+
+        self._raw[self._size:end] = features
+        self._clip_ids[self._size:end] = clip_ids
+        self._frames[self._size:end] = frames
+        self._sum += features.sum(axis=0, dtype=np.float64)
+        self._sum_squares += np.square(features, dtype=np.float64).sum(axis=0)
+        self._size = end
+
+    def _refresh(self):
+        """Bring the normalized features (and the KD-tree) up to date with the inserted rows."""
+        if self.mean is None or self._size >= 2 * self._stats_size:
+            mean = self._sum / self._size
+            std = np.sqrt(np.maximum(self._sum_squares / self._size - mean ** 2, 0.0))
+            std[std < 1e-6] = 1.0
+            self.mean, self.std = mean.astype(np.float32), std.astype(np.float32)
+            self._stats_size = self._size
+            self._normalized = 0
+            self.tree, self._tree_size = None, 0
+
+        if len(self._features) < self._size:
+            self._features = _grown(self._features[:self._normalized], len(self._raw))
+            self._squared_norms = _grown(self._squared_norms[:self._normalized], len(self._raw))
+        new = slice(self._normalized, self._size)
+        self._features[new] = (self._raw[new] - self.mean) / self.std
+        self._squared_norms[new] = np.einsum("ij,ij->i", self._features[new], self._features[new])
+        self._normalized = self._size
+
+        if (cKDTree is not None and self.dimensions <= self.kd_tree_max_dims
+                and self._size - self._tree_size > self._tree_size):
+            self.tree = cKDTree(self.features.copy())
+            self._tree_size = self._size
+
+    def _brute_force(self, queries, k, first=0):
+        """k nearest rows among the normalized rows from `first` on."""
+        query_norms = np.einsum("ij,ij->i", queries, queries)[:, None]
+        best_distances = np.full((len(queries), 0), np.inf, dtype=np.float32)
+        best_indices = np.empty((len(queries), 0), dtype=np.int64)
+
+        for start in range(first, self._normalized, self.block_size):
+            block = self.features[start:start + self.block_size]
+            distances = query_norms + self.squared_norms[start:start + len(block)] - 2 * queries @ block.T
+            indices = np.broadcast_to(np.arange(start, start + len(block)), distances.shape)
+
+            distances = np.concatenate([best_distances, distances], axis=1)
+            indices = np.concatenate([best_indices, indices], axis=1)
+            if distances.shape[1] > k:
+                keep = np.argpartition(distances, k - 1, axis=1)[:, :k]
+                distances = np.take_along_axis(distances, keep, axis=1)
+                indices = np.take_along_axis(indices, keep, axis=1)
+            best_distances, best_indices = distances, indices
+
+        order = np.argsort(best_distances, axis=1)
+        best_distances = np.take_along_axis(best_distances, order, axis=1)
+        best_indices = np.take_along_axis(best_indices, order, axis=1)
+        return np.sqrt(np.maximum(best_distances, 0)), best_indices
+
+    def query(self, features, k=5):
+        """
+        Find the k nearest indexed frames for each feature vector.
+
+        Parameters:
+        features (numpy.ndarray): Un-normalized features of shape (queries, dimensions),
+            as returned by pose_features().
+        k (int): Number of neighbours. Default is 5.
+
+        Returns:
+        tuple: (distances, clip_names, frames), each of shape (queries, k), nearest first.
+        """
+        if not len(self):
+            raise ValueError("The pose index is empty")
+        if self._normalized < self._size:
+            self._refresh()
+
+        k = min(k, len(self))
+        queries = ((np.asarray(features, dtype=np.float32) - self.mean) / self.std).astype(np.float32)
+        if self.tree is not None:
+            tree_k = min(k, self._tree_size)
+            distances, indices = self.tree.query(queries, k=tree_k)
+            distances, indices = distances.reshape(len(queries), tree_k), indices.reshape(len(queries), tree_k)
+            if self._tree_size < self._size:
+                # Rows inserted since the tree was built
+                tail_distances, tail_indices = self._brute_force(queries, k, first=self._tree_size)
+                distances = np.concatenate([distances, tail_distances], axis=1)
+                indices = np.concatenate([indices, tail_indices], axis=1)
+                order = np.argsort(distances, axis=1)[:, :k]
+                distances = np.take_along_axis(distances, order, axis=1)
+                indices = np.take_along_axis(indices, order, axis=1)
+        else:
+            distances, indices = self._brute_force(queries, k)
+
+        clip_names = np.array(self.clip_names, dtype=object)[self.clip_ids[indices]]
+        return distances, clip_names, self.frames[indices]
+
+    def query_clip(self, clip, k=5):
+        """Find the k nearest indexed frames for every frame of a clip."""
+        return self.query(self.pose_features(clip), k)
+
+    def save(self, file_path):
+        """Persist the index to an .npz file."""
+        np.savez(file_path,
+                 raw_features=self.raw_features,
+                 clip_ids=self.clip_ids,
+                 frames=self.frames,
+                 clip_names=np.array(self.clip_names, dtype=str),
+                 joint_names=np.array(self.joint_names, dtype=str),
+                 joints=np.array(self.joints, dtype=str),
+                 root_joint=np.array(self.root_joint or "", dtype=str),
+                 velocity_weight=np.array(self.velocity_weight))
+
+    @classmethod
+    def load(cls, file_path, **kwargs):
+        """Load an index written by save(). Extra keyword arguments override search settings."""
+        with np.load(file_path) as archive:
+            index = cls(archive["joint_names"].tolist(),
+                        joints=archive["joints"].tolist(),
+                        root_joint=str(archive["root_joint"]) or None,
+                        velocity_weight=float(archive["velocity_weight"]),
+                        **kwargs)
+            if archive["raw_features"].shape[1] != index.dimensions:
+                raise ValueError(f"{file_path} was built with a different feature layout; rebuild the index")
+            index._append(archive["raw_features"], archive["clip_ids"], archive["frames"])
+            index.clip_names = archive["clip_names"].tolist()
+        return index
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Build a pose nearest-neighbour index over motion clips.")
+    parser.add_argument("clips", nargs="+", help="CSV or JSON motion clips")
+    parser.add_argument("--joints", nargs="*", help="Joints used for matching (default: all)")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--save", help="Write the index to this .npz file")
+    args = parser.parse_args()
+
+    clips = [load_clip(path) for path in args.clips]
+    index = PoseIndex(clips[0].joint_names, joints=args.joints)
+
+    started = time.perf_counter()
+    for clip in clips:
+        index.add_clip(clip)
+    index.query(index.raw_features[:1], args.k)
+    logging.info(f"Indexed {len(index)} frames x {index.dimensions} dims in {time.perf_counter() - started:.3f}s "
+                 f"({'KD-tree' if index.tree is not None else 'blocked brute force'})")
+
+    for clip in clips:
+        started = time.perf_counter()
+        distances, names, frames = index.query_clip(clip, args.k)
+        ms = (time.perf_counter() - started) * 1000
+        print(f"{clip.name}: {clip.num_frames} queries in {ms:.2f} ms ({ms / clip.num_frames:.3f} ms/query), "
+              f"frame {clip.frames[0]} -> {[(name, int(frame)) for name, frame in zip(names[0], frames[0])]}")
+
+    if args.save:
+        index.save(args.save)
+        logging.info(f"Saved index to {args.save}")